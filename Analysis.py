@@ -0,0 +1,304 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+
+Batch analysis of positions: each line of the input is a position, written as
+    -> the sequence of the columns chosen from the empty board (e.g. 3342, only with less than 11 columns), or
+    -> the board: 42 characters 'x', 'o' or '.' row by row, starting from the bottom row
+       (rows x columns characters on the other boards)
+For each position a line in json is written with the state of the game (as Game.winner), the available columns,
+the value of the board after the action in each available column and the action chosen by the artificial player
+(the loaded policy of the player to move, as ArtificialPlayer.chooseAction with exp_rate=0).
+The positions are evaluated in batches with numpy, the batches are split among worker processes.
+"""
+
+import sys
+import json
+import numpy as np
+
+from Enumerations import CellState, GameState
+from Player import ArtificialPlayer
+from Zobrist import PLY_SHIFT
+from Tablebase import loadTablebase
+from Board import DEFAULT_CONFIG
+
+# Policies used by the worker (see initWorker)
+workerPlayers = None
+
+
+class BatchEvaluator:
+    def __init__(self, playerX, playerO):
+        """
+        Initialize the tables used to evaluate many boards at once (on the board of the players)
+        :param playerX: artificial player used when X is to move
+        :param playerO: artificial player used when O is to move
+        """
+        self.players = {CellState.X_Value: playerX, CellState.O_Value: playerO}
+        config = playerX.config
+        self.rows = config.rows
+        self.cols = config.cols
+        self.k = config.k
+        cells = config.cells
+
+        # Keys of the cells: column 0 for X, column 1 for O
+        self.zobrist = np.array(config.zobrist, dtype=np.uint64)
+
+        # All the lines of K cells, plus an empty line (index len(lines)) used to pad the lines of each cell
+        self.lines = np.array(config.lines, dtype=np.intp)
+        cellLines = [[] for _ in range(cells)]
+        for index, line in enumerate(self.lines):
+            for cell in line:
+                cellLines[cell].append(index)
+        width = max(len(indexes) for indexes in cellLines)
+        self.cellLines = np.full((cells, width), len(self.lines), dtype=np.intp)
+        for cell, indexes in enumerate(cellLines):
+            self.cellLines[cell, :len(indexes)] = indexes
+
+    def parse(self, line):
+        """
+        Method that reads a position
+        :param line: sequence of columns or board (see the description of the module)
+        :return: the flattened board, None if the position is not valid
+        """
+        cells = self.rows * self.cols
+        board = np.zeros(cells, dtype=np.int8)
+        if line.isdigit() and self.cols <= 10:
+            heights = [0] * self.cols
+            symbol = CellState.X_Value
+            for move in line:
+                y = int(move)
+                if y >= self.cols or heights[y] == self.rows:
+                    return None
+                board[heights[y] * self.cols + y] = symbol
+                heights[y] += 1
+                symbol = -symbol
+            return board
+        if len(line) != cells:
+            return None
+        for cell, token in enumerate(line.lower()):
+            if token == 'x':
+                board[cell] = CellState.X_Value
+            elif token == 'o':
+                board[cell] = CellState.O_Value
+            elif token != '.':
+                return None
+        return board
+
+    def evaluate(self, boards):
+        """
+        Method that analyses a batch of boards
+        :param boards: matrix with one flattened board for each row
+        :return: a tuple (states, legal, values, actions):
+            states -> GameState of each board
+            legal -> boolean matrix (boards x columns) of the available columns
+            values -> matrix (boards x columns) of the values of the boards after each action (nan if unknown)
+            actions -> column chosen in each board (-1 if the game is over)
+        """
+        count = len(boards)
+        columns = np.arange(self.cols)
+
+        # State of the game: sum of the symbols of every line
+        sums = boards[:, self.lines].sum(axis=2, dtype=np.int16)
+        # As Game.winner, the first line found scanning the cells (from the first cell of the line) wins
+        starts = self.lines[:, 0]
+        noLine = len(boards[0])
+        xFirst = np.where(sums == self.k, starts, noLine).min(axis=1)
+        oFirst = np.where(sums == -self.k, starts, noLine).min(axis=1)
+        discs = np.count_nonzero(boards, axis=1)
+        full = discs == self.rows * self.cols
+        states = np.full(count, GameState.UNDEFINED, dtype=np.int8)
+        states[full] = GameState.DRAW
+        states[oFirst < noLine] = GameState.LOOSE
+        states[(xFirst < noLine) & (xFirst <= oFirst)] = GameState.WIN
+        open_ = states == GameState.UNDEFINED
+
+        # Player to move, available columns and the cell of each action
+        symbols = np.where(discs % 2 == 0, CellState.X_Value, CellState.O_Value).astype(np.int8)
+        heights = np.count_nonzero(boards.reshape(count, self.rows, self.cols), axis=1)
+        legal = (heights < self.rows) & open_[:, None]
+        targets = np.minimum(heights, self.rows - 1) * self.cols + columns
+
+        # Immediate win or block, using the lines through the cell of each action
+        padded = np.concatenate([sums, np.zeros((count, 1), dtype=np.int16)], axis=1)
+        throughTarget = padded[np.arange(count)[:, None, None], self.cellLines[targets]]
+        wins = legal & (throughTarget + symbols[:, None, None] == self.k * symbols[:, None, None]).any(axis=2)
+        blocks = legal & (throughTarget - symbols[:, None, None] == -self.k * symbols[:, None, None]).any(axis=2)
+
+        values = np.full((count, self.cols), np.nan)
+        actions = np.full(count, -1, dtype=np.intp)
+        for symbol, player in self.players.items():
+            rows = np.flatnonzero(open_ & (symbols == symbol))
+            if len(rows) == 0:
+                continue
+            # Hashes of the boards after each action
+            piece = 0 if symbol == CellState.X_Value else 1
+            cellKeys = np.where(boards[rows] == CellState.X_Value, self.zobrist[:, 0],
+                                np.where(boards[rows] == CellState.O_Value, self.zobrist[:, 1], np.uint64(0)))
+            keys = np.bitwise_xor.reduce(cellKeys, axis=1)
+            childKeys = (keys[:, None] ^ self.zobrist[targets[rows], piece]) \
+                + ((discs[rows, None].astype(np.uint64) + 1) << np.uint64(PLY_SHIFT))
+            table = player.states_value
+            found = [[table.get(key) for key in keyRow] for keyRow in childKeys.tolist()]
+            values[rows] = np.array([[np.nan if value is None else value for value in valueRow]
+                                     for valueRow in found])
+
+            # Greedy action: the last column with the highest value, unknown values are 0
+            greedy = np.where(legal[rows], np.nan_to_num(values[rows], nan=0.0), -np.inf)
+            chosen = self.cols - 1 - np.argmax(greedy[:, ::-1], axis=1)
+            # Blocking the opponent comes before the values, winning before everything
+            chosen = np.where(blocks[rows].any(axis=1), np.argmax(blocks[rows], axis=1), chosen)
+            if player.tablebase is not None:
+                chosen = self.probeTablebase(player, boards[rows], legal[rows], symbol, chosen)
+            chosen = np.where(wins[rows].any(axis=1), np.argmax(wins[rows], axis=1), chosen)
+            actions[rows] = chosen
+
+        values[~legal] = np.nan
+        return states, legal, values, actions
+
+    def probeTablebase(self, player, boards, legal, symbol, chosen):
+        """
+        Method that replaces the actions with the perfect ones in the positions of the tablebase
+        :param player: the artificial player with the tablebase
+        :param boards: matrix with one flattened board for each row
+        :param legal: boolean matrix of the available columns
+        :param symbol: symbol of the player to move
+        :param chosen: actions chosen without the tablebase
+        :return: the actions
+        """
+        chosen = chosen.copy()
+        empty = self.rows * self.cols - np.count_nonzero(boards, axis=1)
+        for row in np.flatnonzero(empty <= player.tablebase.maxEmpty):
+            positions = [int(y) for y in np.flatnonzero(legal[row])]
+            action = player.tablebase.bestAction(positions, boards[row].reshape(self.rows, self.cols), symbol)
+            if action is not None:
+                chosen[row] = action
+        return chosen
+
+    def analyze(self, lines):
+        """
+        Method that analyses a batch of positions
+        :param lines: list of positions (see the description of the module)
+        :return: list with one line in json for each position
+        """
+        boards = [self.parse(line) for line in lines]
+        valid = [index for index, board in enumerate(boards) if board is not None]
+        results = [json.dumps({"position": line, "error": "invalid position"}) for line in lines]
+        if len(valid) == 0:
+            return results
+
+        states, legal, values, actions = self.evaluate(np.array([boards[index] for index in valid]))
+        for row, index in enumerate(valid):
+            columns = np.flatnonzero(legal[row])
+            results[index] = json.dumps({
+                "position": lines[index],
+                "state": GameState(states[row]).name,
+                "legal": columns.tolist(),
+                "values": [None if np.isnan(values[row, y]) else float(values[row, y]) for y in columns],
+                "action": None if actions[row] < 0 else int(actions[row])
+            })
+        return results
+
+
+def createPlayers(config=DEFAULT_CONFIG, shardedPolicy=False, policyMemory=None):
+    """
+    Method that loads the policies of the artificial players as in the game with a human player
+    :param config: the BoardConfig of the game
+    :param shardedPolicy: True to read the policies saved in shards (only the shards needed are read)
+    :param policyMemory: number of states in memory over which the shards are unloaded (None to keep them)
+    :return: a pair (player X, player O)
+    """
+    playerX = ArtificialPlayer("U-0318", CellState.X_Value, 0, config)
+    playerO = ArtificialPlayer("U-0314", CellState.O_Value, 0, config)
+    if shardedPolicy:
+        playerX.useShardedPolicy(policyMemory)
+        playerO.useShardedPolicy(policyMemory)
+    playerX.loadPolicy(playerX.policyFile(), False)
+    playerO.loadPolicy(playerO.policyFile(), False)
+    playerX.tablebase = playerO.tablebase = loadTablebase(config)
+    return playerX, playerO
+
+
+def initWorker(config=DEFAULT_CONFIG, shardedPolicy=False, policyMemory=None):
+    """
+    Method executed once by every worker process: load the policies
+    :param config: the BoardConfig of the game
+    :param shardedPolicy: True to read the policies saved in shards
+    :param policyMemory: number of states in memory over which the shards are unloaded (None to keep them)
+    :return: nothing
+    """
+    global workerPlayers
+    workerPlayers = BatchEvaluator(*createPlayers(config, shardedPolicy, policyMemory))
+
+
+def analyzeBatch(lines):
+    """
+    Method executed by the worker processes
+    :param lines: list of positions
+    :return: list of results in json
+    """
+    return workerPlayers.analyze(lines)
+
+
+def readBatches(file, batchSize):
+    """
+    Method that reads the positions in batches
+    :param file: the opened input
+    :param batchSize: number of positions in each batch
+    :return: a generator of lists of positions
+    """
+    batch = []
+    for line in file:
+        line = line.strip()
+        # Skip the empty lines
+        if not line:
+            continue
+        batch.append(line)
+        if len(batch) == batchSize:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def analyzeFile(inputPath=None, outputPath=None, batchSize=10000, processes=None, config=DEFAULT_CONFIG,
+                shardedPolicy=False, policyMemory=None):
+    """
+    Method that analyses all the positions of a file
+    :param inputPath: path of the positions (None for the standard input)
+    :param outputPath: path of the results (None for the standard output)
+    :param batchSize: number of positions in each batch
+    :param processes: number of worker processes (None for one for each cpu, 1 to not use other processes)
+    :param config: the BoardConfig of the game
+    :param shardedPolicy: True to read the policies saved in shards
+    :param policyMemory: number of states in memory over which the shards are unloaded (None to keep them)
+    :return: number of positions analysed
+    """
+    source = sys.stdin if inputPath is None else open(inputPath)
+    target = sys.stdout if outputPath is None else open(outputPath, 'w')
+    count = 0
+    try:
+        if processes == 1:
+            initWorker(config, shardedPolicy, policyMemory)
+            results = map(analyzeBatch, readBatches(source, batchSize))
+            pool = None
+        else:
+            from multiprocessing import Pool
+            pool = Pool(processes, initializer=initWorker, initargs=(config, shardedPolicy, policyMemory))
+            # The results are written in the same order of the positions
+            results = pool.imap(analyzeBatch, readBatches(source, batchSize))
+        for batch in results:
+            target.write("\n".join(batch) + "\n")
+            count += len(batch)
+        if pool is not None:
+            pool.close()
+            pool.join()
+    finally:
+        if inputPath is not None:
+            source.close()
+        if outputPath is not None:
+            target.close()
+    return count
@@ -0,0 +1,121 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+
+Configuration of the board: number of rows, number of columns and number of symbols in a line to win (K).
+Everything that depends only on the configuration (the lines of K cells, the lines through each cell, the keys
+of the hash and the header of the policy files) is computed once and shared by the game and the players.
+"""
+
+from functools import lru_cache
+
+from Zobrist import zobristTable, PLY_SHIFT
+
+# Dimension of the classic game board
+BOARD_ROWS = 6
+BOARD_COLS = 7
+# Number of symbols in a line to win
+LINE_LENGTH = 4
+
+
+def straightLineTuples(board_rows=BOARD_ROWS, board_cols=BOARD_COLS, length=LINE_LENGTH):
+    """
+    Method that builds the n-tuples made by all the straight lines of cells of the board
+    :param board_rows: number of rows in the board
+    :param board_cols: number of columns in the board
+    :param length: number of cells in each tuple
+    :return: a list of tuples, each one containing the indexes of the cells in the flattened board
+    """
+    tuples = []
+    for x in range(board_rows):
+        for y in range(board_cols):
+            # Vertical, horizontal and the two diagonals
+            for x_dir, y_dir in ((1, 0), (0, 1), (1, 1), (-1, 1)):
+                x_end = x + (length - 1) * x_dir
+                y_end = y + (length - 1) * y_dir
+                if 0 <= x_end < board_rows and 0 <= y_end < board_cols:
+                    tuples.append([(x + i * x_dir) * board_cols + y + i * y_dir for i in range(length)])
+    return tuples
+
+
+class BoardConfig:
+    def __init__(self, board_rows=BOARD_ROWS, board_cols=BOARD_COLS, k=LINE_LENGTH):
+        """
+        Initialize the tables of a board configuration (use boardConfig to share them)
+        :param board_rows: number of rows in the board
+        :param board_cols: number of columns in the board
+        :param k: number of symbols in a line to win
+        """
+        if board_rows < 1 or board_cols < 1:
+            raise ValueError("The board must have at least one row and one column")
+        # The ply is saved in the top bits of the hash
+        if board_rows * board_cols >= 1 << (64 - PLY_SHIFT):
+            raise ValueError("The board can have at most " + str((1 << (64 - PLY_SHIFT)) - 1) + " cells")
+        if k < 2 or k > max(board_rows, board_cols):
+            raise ValueError("K must be between 2 and the longest side of the board")
+
+        self.rows = board_rows
+        self.cols = board_cols
+        self.k = k
+        self.cells = board_rows * board_cols
+
+        # All the lines of K cells
+        self.lines = straightLineTuples(board_rows, board_cols, k)
+        # For each cell, the other cells of every line that contains it:
+        # checking the lines through the last action costs the same on every board
+        self.cellLines = [[] for _ in range(self.cells)]
+        for line in self.lines:
+            for cell in line:
+                self.cellLines[cell].append(tuple(other for other in line if other != cell))
+
+        # Keys of the cells for the hash of the boards
+        self.zobrist = zobristTable(board_rows, board_cols)
+
+        # The files of the classic board keep the names and the format of the first versions
+        isClassic = (board_rows, board_cols, k) == (BOARD_ROWS, BOARD_COLS, LINE_LENGTH)
+        # Suffix of the names of the files (policies, tablebase, caches) of the configuration
+        self.tag = "" if isClassic else "_{}x{}k{}".format(board_rows, board_cols, k)
+        # First object in the policy files of the configuration (None: no header)
+        self.header = None if isClassic else ("board", board_rows, board_cols, k)
+
+    def __reduce__(self):
+        # The worker processes rebuild the tables instead of receiving them
+        return boardConfig, (self.rows, self.cols, self.k)
+
+    def __repr__(self):
+        return "BoardConfig({}, {}, {})".format(self.rows, self.cols, self.k)
+
+    def completesLine(self, cells, cell, symbol):
+        """
+        Check if a symbol in a cell completes a line of K symbols (the content of the cell is not read)
+        :param cells: the flattened board (list or array)
+        :param cell: the cell of the action
+        :param symbol: the symbol added
+        :return: True if the player with symbol wins with the action
+        """
+        for others in self.cellLines[cell]:
+            for other in others:
+                if cells[other] != symbol:
+                    break
+            else:
+                return True
+        return False
+
+
+@lru_cache(maxsize=None)
+def boardConfig(board_rows=BOARD_ROWS, board_cols=BOARD_COLS, k=LINE_LENGTH):
+    """
+    :param board_rows: number of rows in the board
+    :param board_cols: number of columns in the board
+    :param k: number of symbols in a line to win
+    :return: the BoardConfig, built only the first time
+    """
+    return BoardConfig(board_rows, board_cols, k)
+
+
+# The classic Four In A Line board
+DEFAULT_CONFIG = boardConfig(BOARD_ROWS, BOARD_COLS, LINE_LENGTH)
@@ -0,0 +1,148 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+"""
+
+import threading
+import time
+import numpy as np
+
+from Storage import writeAtomically, readPickled
+
+# Where the training checkpoint is written
+CHECKPOINT_PATH = "Files/checkpoint_training"
+
+
+class Checkpointer:
+    def __init__(self, players, path=CHECKPOINT_PATH, everyGames=None, everySeconds=None, parts=None):
+        """
+        Initialize the checkpointer used during the training
+        :param players: list of the artificial players whose policy is saved
+        :param path: path of the checkpoint file
+        :param everyGames: save a checkpoint every everyGames games (None to disable)
+        :param everySeconds: save a checkpoint every everySeconds seconds (None to disable)
+        :param parts: dictionary name -> other object of the training whose state is saved (with the methods
+            checkpointSnapshot and restoreCheckpointSnapshot), None if there aren't
+        """
+        self.players = players
+        self.parts = {} if parts is None else parts
+        self.path = path
+        self.everyGames = everyGames
+        self.everySeconds = everySeconds
+
+        # Games played and time of the last checkpoint
+        self.lastGame = 0
+        self.lastTime = time.monotonic()
+
+        # Thread that is writing the last checkpoint (if any)
+        self.writer = None
+
+    def setStart(self, gamesPlayed):
+        """
+        Set the number of games already played (when the training is resumed)
+        :param gamesPlayed: number of games already played
+        :return: nothing
+        """
+        self.lastGame = gamesPlayed
+        self.lastTime = time.monotonic()
+
+    def isDue(self, gamesPlayed):
+        """
+        Check if it is time to save a new checkpoint
+        :param gamesPlayed: number of games played since the beginning of the training
+        :return: True if a checkpoint has to be saved, False otherwise
+        """
+        if self.everyGames is not None and gamesPlayed - self.lastGame >= self.everyGames:
+            return True
+        if self.everySeconds is not None and time.monotonic() - self.lastTime >= self.everySeconds:
+            return True
+        return False
+
+    def maybeSave(self, gamesPlayed):
+        """
+        Method called at the end of every training game: it saves a checkpoint if it's due
+        :param gamesPlayed: number of games played since the beginning of the training
+        :return: nothing
+        """
+        if self.isDue(gamesPlayed):
+            self.save(gamesPlayed)
+
+    def save(self, gamesPlayed):
+        """
+        Take a snapshot of the policies and write it in background
+        If the previous checkpoint is still being written the save is postponed to the next game
+        :param gamesPlayed: number of games played since the beginning of the training
+        :return: True if the checkpoint has been started, False otherwise
+        """
+        if self.writer is not None and self.writer.is_alive():
+            return False
+
+        # The snapshot is taken in the training thread, so it is consistent
+        snapshot = {
+            "games": gamesPlayed,
+            "rng": np.random.get_state(),
+            "policies": {player.name: player.policySnapshot() for player in self.players},
+            # The exploration rates can be lowered during the training (see ConvergenceMonitor)
+            "expRates": {player.name: player.exp_rate for player in self.players},
+            "parts": {name: part.checkpointSnapshot() for name, part in self.parts.items()}
+        }
+
+        self.writer = threading.Thread(target=writeAtomically, args=(self.path, snapshot))
+        self.writer.start()
+
+        self.lastGame = gamesPlayed
+        self.lastTime = time.monotonic()
+        return True
+
+    def finish(self):
+        """
+        Wait for the checkpoint that is being written (if any)
+        :return: nothing
+        """
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+
+
+def loadCheckpoint(path=CHECKPOINT_PATH):
+    """
+    Load the last checkpoint saved
+    :param path: path of the checkpoint file
+    :return: the snapshot saved by the Checkpointer, None if there isn't a checkpoint
+    """
+    return readPickled(path)
+
+
+def resumeCheckpoint(players, path=CHECKPOINT_PATH, parts=None):
+    """
+    Restore the policies and the exploration rates of the players, the other objects of the training and the
+    random generator from the last checkpoint
+    :param players: list of the artificial players to restore
+    :param path: path of the checkpoint file
+    :param parts: dictionary name -> other object of the training to restore (see Checkpointer), None if there
+        aren't
+    :return: the number of games already played (0 if there isn't a checkpoint)
+    """
+    snapshot = loadCheckpoint(path)
+    if snapshot is None:
+        print("No checkpoint found, starting from scratch")
+        return 0
+
+    for player in players:
+        if player.name in snapshot["policies"]:
+            player.restorePolicySnapshot(snapshot["policies"][player.name])
+        if player.name in snapshot.get("expRates", {}):
+            player.exp_rate = snapshot["expRates"][player.name]
+    # The checkpoints of the first versions don't have the exploration rates and the other objects
+    savedParts = snapshot.get("parts", {})
+    for name, part in ({} if parts is None else parts).items():
+        if name in savedParts:
+            part.restoreCheckpointSnapshot(savedParts[name])
+    np.random.set_state(snapshot["rng"])
+
+    print("Resumed from checkpoint after " + str(snapshot["games"]) + " games")
+    return snapshot["games"]
@@ -0,0 +1,69 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+"""
+
+from Enumerations import CellState
+
+
+class Client:
+
+    def showBoard(self):
+        """
+        Method that shows the game board
+        :return: nothing
+        """
+        pass
+
+    def showResult(self , message):
+        """
+        Print the result of the game
+        :param message: is the message to print (with the winner)
+        :return: nothing
+        """
+        pass
+
+    def waitEvents(self):
+        """
+        Method that waits for the user (only the clients with a main loop need it)
+        :return: nothing
+        """
+        pass
+
+
+class CLI(Client):
+    def __init__(self , g):
+        self.game = g
+        self.last_action = None
+
+    def showBoard(self):
+        """
+        Print the board in the command line
+        :return: nothing
+        """
+        separator = '-' * (4 * len(self.game.board[0]) + 1)
+        for i in range(len(self.game.board)-1, -1, -1):
+            print(separator)
+            out = '| '
+            for j in range(0, len(self.game.board[0])):
+                if self.game.board[i, j] == CellState.X_Value:
+                    token = 'x'
+                elif self.game.board[i, j] == CellState.O_Value:
+                    token = 'o'
+                else:
+                    token = ' '
+                out += token + ' | '
+            print(out)
+        print(separator)
+
+    def showResult(self , message):
+        """
+        Method that prints the result of the game
+        :param message: message containing the winner
+        :return: nothing
+        """
+        print(message)
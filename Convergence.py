@@ -0,0 +1,191 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+
+Early stop of the training: over the last games (a sliding window) are measured
+    -> the mean absolute change of the values in each back propagation
+    -> the number of new states for each state updated
+    -> the score of the players against a copy of themselves taken at the previous evaluation
+When all the measures are under their thresholds the training stops, or the exploration rate is lowered
+(and the training stops when it's under the minimum).
+"""
+
+from collections import deque
+
+from Enumerations import GameState
+
+# Exploration rate of the evaluation games (otherwise all the games between the same policies are equal)
+EVALUATION_EXP_RATE = 0.1
+
+
+class ConvergenceMonitor:
+    def __init__(self, player1, player2, window=1000, valueChange=1e-3, newStates=0.01, scoreDelta=None,
+                 evaluationGames=100, decay=None, minExpRate=0.01):
+        """
+        Initialize the monitor of the training
+        :param player1: the artificial player with X
+        :param player2: the artificial player with O
+        :param window: number of last games measured
+        :param valueChange: threshold of the mean absolute change of the values in each back propagation
+        :param newStates: threshold of the number of new states for each state updated
+        :param scoreDelta: threshold of the distance from 0.5 of the score against the copy of the players taken
+            at the previous evaluation (None to not play the evaluation games)
+        :param evaluationGames: number of evaluation games (half with each symbol) played every window games
+        :param decay: factor applied to the exploration rate when the thresholds are met (None to stop)
+        :param minExpRate: exploration rate under which the training stops
+        """
+        self.player1 = player1
+        self.player2 = player2
+        self.window = window
+        self.valueChange = valueChange
+        self.newStates = newStates
+        self.scoreDelta = scoreDelta
+        self.evaluationGames = evaluationGames
+        self.decay = decay
+        self.minExpRate = minExpRate
+
+        # For each back propagation of the window: (mean absolute change, states updated, new states)
+        self.updates = deque(maxlen=2 * window)
+        self.gamesInWindow = 0
+        # Copies of the players taken at the last evaluation (with their policies) and score of the last evaluation
+        self.frozen = None
+        self.frozenPolicies = None
+        self.score = None
+
+    def measures(self):
+        """
+        :return: a pair (mean absolute change of the values, new states for each state updated) over the window
+        """
+        updated = sum(update[1] for update in self.updates)
+        meanChange = sum(update[0] for update in self.updates) / max(len(self.updates), 1)
+        return meanChange, sum(update[2] for update in self.updates) / max(updated, 1)
+
+    def freeze(self):
+        """
+        Method that copies the current policies of the players (without the tablebase, that doesn't learn)
+        :return: the pair of copies (X, O)
+        """
+        self.frozenPolicies = [player.policySnapshot() for player in (self.player1, self.player2)]
+        return self.frozenCopies(self.frozenPolicies)
+
+    def frozenCopies(self, policies):
+        """
+        Method that creates the copies of the players that play the evaluation games
+        :param policies: the pair of policies of the copies (X, O), as taken by policySnapshot
+        :return: the pair of copies (X, O)
+        """
+        copies = []
+        for player, policy in zip((self.player1, self.player2), policies):
+            copy = type(player)(player.name, player.symbol, EVALUATION_EXP_RATE, config=player.config)
+            copy.restorePolicySnapshot(policy)
+            copy.tablebase = player.tablebase
+            copies.append(copy)
+        return copies
+
+    def evaluate(self):
+        """
+        Method that plays the current players against the copies of the last evaluation (without learning)
+        :return: the score of the current players: 1 for each win and 0.5 for each draw, divided by the games
+        """
+        # Imported here: Game imports this module
+        from Game import Game
+
+        expRates = (self.player1.exp_rate, self.player2.exp_rate)
+        self.player1.exp_rate = self.player2.exp_rate = EVALUATION_EXP_RATE
+        points = 0
+        for index in range(self.evaluationGames):
+            current = self.player1 if index % 2 == 0 else self.player2
+            if index % 2 == 0:
+                game = Game(self.player1, self.frozen[1])
+            else:
+                game = Game(self.frozen[0], self.player2)
+            result = playWithoutLearning(game)
+            if result == GameState.DRAW:
+                points += 0.5
+            elif (result == GameState.WIN) == (current is self.player1):
+                points += 1
+        self.player1.exp_rate, self.player2.exp_rate = expRates
+        return points / self.evaluationGames
+
+    def gameEnded(self, gamesPlayed):
+        """
+        Method called after the back propagation of each training game
+        :param gamesPlayed: number of training games played
+        :return: the reason to stop the training, None to continue
+        """
+        for player in (self.player1, self.player2):
+            if player.lastUpdate is not None:
+                self.updates.append(player.lastUpdate)
+        self.gamesInWindow += 1
+        if self.gamesInWindow < self.window:
+            return None
+        self.gamesInWindow = 0
+
+        meanChange, newStateRate = self.measures()
+        if self.scoreDelta is not None:
+            if self.frozen is not None:
+                self.score = self.evaluate()
+            self.frozen = self.freeze()
+
+        converged = meanChange < self.valueChange and newStateRate < self.newStates and \
+            (self.scoreDelta is None or (self.score is not None and abs(self.score - 0.5) < self.scoreDelta))
+        if not converged:
+            return None
+
+        reason = "after {} games the mean value change is {:.2e} (< {:.2e}), the new state rate is {:.2e} " \
+                 "(< {:.2e})".format(gamesPlayed, meanChange, self.valueChange, newStateRate, self.newStates)
+        if self.scoreDelta is not None:
+            reason += ", the score against the previous policy is {:.3f}".format(self.score)
+
+        if self.decay is not None:
+            expRate = max(self.player1.exp_rate, self.player2.exp_rate) * self.decay
+            if expRate >= self.minExpRate:
+                self.player1.exp_rate = self.player2.exp_rate = expRate
+                # Measure the games with the new exploration rate only
+                self.updates.clear()
+                print("\nConverged " + reason + ": exploration rate lowered to {:.3f}".format(expRate))
+                return None
+            reason += " and the exploration rate is at the minimum"
+        return reason
+
+    def checkpointSnapshot(self):
+        """
+        Method that takes the state of the window saved in the training checkpoints (see Checkpointer)
+        The policies of the copies are saved as they are: the copies never learn
+        :return: dictionary with the measures of the window, the score and the policies of the copies
+        """
+        return {"updates": list(self.updates), "gamesInWindow": self.gamesInWindow, "score": self.score,
+                "frozenPolicies": self.frozenPolicies}
+
+    def restoreCheckpointSnapshot(self, snapshot):
+        """
+        Method that restores the state of the window taken with checkpointSnapshot
+        :param snapshot: the state of the window
+        :return: nothing
+        """
+        self.updates.clear()
+        self.updates.extend(snapshot["updates"])
+        self.gamesInWindow = snapshot["gamesInWindow"]
+        self.score = snapshot["score"]
+        self.frozenPolicies = snapshot["frozenPolicies"]
+        self.frozen = None if self.frozenPolicies is None else self.frozenCopies(self.frozenPolicies)
+
+
+def playWithoutLearning(game):
+    """
+    Method that plays one game without saving the states and without giving the rewards
+    :param game: the game between two artificial players
+    :return: the GameState at the end of the game
+    """
+    while True:
+        positions = game.availablePositions()
+        childHashes = game.childHashes(positions, game.activePlayer.symbol)
+        game.updateState(game.activePlayer.chooseAction(positions, game.board, childHashes, boardHash=game.hash))
+        result = game.winner()
+        if result is not GameState.UNDEFINED:
+            return result
+        game.updateActivePlayer()
@@ -6,391 +6,44 @@ Example of reinforcement learning applied to a game:
     -> it's possible to train 2 players (one that start first and one that start for second)
     -> the training can be between the 2 artificial player and also during the game with a human player
 """
-import sys
+import os
+import atexit
+import argparse
 import numpy as np
-from pathlib import Path
 from numpy.random import rand
-from tqdm import tqdm
 
 import Player
 from Enumerations import CellState, GameState
-from Player import ArtificialPlayer, HumanPlayer
+from Player import ArtificialPlayer, NTupleArtificialPlayer, HumanPlayer
+from Client import CLI
+from Checkpoint import Checkpointer, resumeCheckpoint, CHECKPOINT_PATH
+from Zobrist import childHash, pieceIndex, PLY_UNIT
+from Tablebase import loadTablebase
+from Board import boardConfig, BOARD_ROWS, BOARD_COLS, LINE_LENGTH
+from Latency import LatencyRecorder, measure
 
-from tkinter import Tk, Canvas, Entry, Button, PhotoImage, Message , Menu
+# The gui (tkinter) and the progress bar (tqdm) are imported only in the modes that use them
+# The profiler is imported only with --profile: it replaces snapshotMemory (see the main)
 
-# Dimension of the game board
-BOARD_COLS = 7
-BOARD_ROWS = 6
 
-# For rebuild the path of the images
-OUTPUT_PATH = Path(__file__).parent
-ASSETS_PATH = OUTPUT_PATH / Path("./Files/Images")
-
-# Starting coordinates of the board in the gui
-X_ZERO_POSITION = 500
-Y_ZERO_POSITION = 600
-
-# Dimension of each button (cell) in the gui
-DIM_CELL_X = 75
-DIM_CELL_Y = 75
-
-
-def relative_to_assets(path: str) -> Path:
+def snapshotMemory():
     """
-    Method that rebuilds the path of all the pictures
-    :param path: picture name
-    :return: complete path
+    Method that takes the snapshot of the memory for the profiler: it does nothing if the run isn't profiled
+    :return: nothing
     """
-    return ASSETS_PATH / Path(path)
-
-
-class Client:
-
-    def showBoard(self):
-        """
-        Method that shows the game board
-        :return: nothing
-        """
-        pass
-
-    def showResult(self , message):
-        """
-        Print the result of the game
-        :param message: is the message to print (with the winner)
-        :return: nothing
-        """
-        pass
-
-
-class GUI(Client):
-    def __init__(self , g , w):
-
-        # Save the game
-        self.game = g
-
-        # Save the last action: pair (x, y)
-        self.last_action = None
-
-        # Create the main window
-        self.mainWindow = w
-
-        # Create the workspace
-        self.canvas = Canvas(
-            self.mainWindow,
-            height=900,
-            width=900,
-            bd=0,
-            bg="#FAF8F5",
-            highlightthickness=0,
-            relief="ridge"
-        )
-        self.canvas.place(
-            x=0,
-            y=0
-        )
-
-        # List of elements in the page
-        self.elementsInThePage = []
-
-        # Variable that contains the error, if there is one
-        self.error = None
-
-        # Initialize the starting page
-        self.init_starting_page()
-
-    def showError(self):
-        """
-        Method that shows the error
-        :return: nothing
-        """
-        errorMessage = Message(
-            self.mainWindow,
-            text=self.error,
-            width=200,
-            foreground="red",
-            bg = "#FAF8F5"
-        )
-        errorMessage.place(
-            x=300,
-            y=700
-        )
-        self.elementsInThePage.append(errorMessage)
-
-    def init_starting_page(self):
-        """
-        Method that inits the starting page
-        :return: nothing
-        """
-
-        if self.error is not None:
-            self.showError()
-
-        welcomeMessage = Message(
-            self.mainWindow,
-            text="Welcome in 4 in a line Game!",
-            bg="#FAF8F5",
-            width=200
-        )
-        welcomeMessage.place(
-            x=300,
-            y=30
-        )
-
-        self.elementsInThePage.append(welcomeMessage)
-
-        self.canvas.create_image(
-            250,
-            100,
-            image=init_image,
-            anchor="nw"
-        )
-
-        # Create the entry for the player's name under the image
-        nameMessage = Message(
-            self.mainWindow,
-            width=50,
-            bg="#FAF8F5",
-            text="Name:"
-        )
-        nameMessage.place(
-            x=300,
-            y=450
-        )
-
-        self.elementsInThePage.append(nameMessage)
-
-        nameEntry = Entry(
-            bd=0,
-            bg="#ffffff",
-            highlightthickness=0
-        )
-        nameEntry.place(
-            x=350,
-            y=450,
-            width=91.0,
-            height=17.0
-        )
-
-        self.elementsInThePage.append(nameEntry)
-
-        # Add the start game button
-        startGame_button = Button(
-            borderwidth=100,
-            highlightthickness=0,
-            text="Start Game",
-            command=lambda: self.startGame(nameEntry),
-            relief="flat"
-        )
-        startGame_button.place(
-            x=330,
-            y=500,
-            width=114,
-            height=30
-        )
-
-        self.elementsInThePage.append(startGame_button)
-
-    def startGame(self, nameEntry):
-        """
-        Method called clicking on startGame_button in the starting page
-        If the user inserted the name, the game will start , otherwise show the error
-        :return: nothing
-        """
-        # Get the name inserted before deleting the elements
-        nameInserted = nameEntry.get()
-
-        # Delete elements in the current page
-        self.canvas.delete("all")
-        for i in range(len(self.elementsInThePage)):
-            self.elementsInThePage[i].destroy()
-        self.elementsInThePage = []
-
-        # Check if the name is valid, otherwise show an error
-        if nameInserted is None or not nameInserted:
-            self.error = "Insert your name!"
-            self.init_starting_page()
-            return
-        self.error = None
-
-        # print("Name inserted: ", nameInserted)
-
-        # Update the name of the human player
-        if type(self.game.player1) == HumanPlayer:
-            self.game.player1.name = nameInserted
-        else:
-            self.game.player2.name = nameInserted
-
-        # Stop the mainloop
-        mainWindow.quit()
-
-    def showBoard(self):
-        """
-        Print the board
-        :return: nothing
-        """
-        # Stop the previous mainloop
-        mainWindow.quit()
-
-        # Delete all the previous elements
-        for i in range(len(self.elementsInThePage)):
-            self.elementsInThePage[i].destroy()
-        self.elementsInThePage = []
-
-        # Show the error if present
-        if self.error is not None:
-            self.showError()
-
-        # Build the message with players and their symbols
-        messageToShow = str(game.player1.name) + "(X)      VS      " + str(game.player2.name) + "(O)"
-
-        infoMessage = Message(
-            self.mainWindow,
-            text=messageToShow,
-            font="Helvetica 12 bold",
-            width=400,
-            foreground="black",
-            bg = "#FAF8F5"
-        )
-        infoMessage.place(
-            x=300,
-            y=40
-        )
-        self.elementsInThePage.append(infoMessage)
-
-        # Build the board with CellButton elements
-        for row in range(len(self.game.board)):
-            for col in range(len(self.game.board[0])-1, -1, -1):
-                if (row, col) != self.last_action:
-                    color = 'black'
-                else:
-                    color = 'red'
-                cell = CellButton(self, row, col, self.game.board[row][col], color)
-                self.elementsInThePage.append(cell)
-
-    def actionChose(self, y):
-        """
-        Method called when a button cell is clicked
-        :param y: is the coordinate y of the button in the board
-        :return: nothing
-        """
-        if self.game is not None:
-            self.error = self.game.setActionChose(y)
-            # If the action was valid
-            if self.error is None:
-                mainWindow.quit()
-            else:
-                self.showBoard()
-                mainWindow.mainloop()
-
-    def showResult(self , message):
-        """
-        Method that prints the result of the game
-        :param message: message containing the winner
-        :return: nothing
-        """
-        mainWindow.quit()
-        resultMessage = Message(
-            self.mainWindow,
-            text=message,
-            font="Helvetica 12 bold",
-            width=200,
-            foreground="red",
-            bg = "#FAF8F5"
-        )
-        resultMessage.place(
-            x=330,
-            y=60
-        )
-        self.elementsInThePage.append(resultMessage)
-
-
-class CellButton:
-    def __init__(self, gui, x, y, cellSymbol, color='black'):
-        """
-        Initialize the object CellButton
-        :param gui: is the gui in which the object is
-        :param x: is the x position of the button in the board
-        :param y: is the y position of the button in the board
-        :param cellSymbol: is the value of the cell corresponding to the button
-        :param color: it is red for showing the last action of the artificial player
-        """
-        self.x = x
-        self.y = y
-        self.gui = gui
-
-        if cellSymbol == CellState.X_Value:
-            self.symbol = "X"
-        elif cellSymbol == CellState.O_Value:
-            self.symbol = "O"
-        else:
-            self.symbol = ""
-
-        self.cell = Button(
-            borderwidth=2,
-            highlightthickness=3,
-            relief="solid",
-            text = self.symbol,
-            fg=color,
-            font = "bold",
-            command=lambda: self.gui.actionChose(self.y)
-        )
-
-        self.cell.place(
-            y=X_ZERO_POSITION - x * DIM_CELL_X,
-            x=Y_ZERO_POSITION - y * DIM_CELL_Y,
-            width=DIM_CELL_X,
-            height=DIM_CELL_Y
-        )
-
-    def destroy(self):
-        """
-        Method used to destroy the CellButton object as it was a tkinter object
-        :return: nothing
-        """
-        self.cell.destroy()
-
-
-class CLI(Client):
-    def __init__(self , g):
-        self.game = g
-        self.last_action = None
-
-    def showBoard(self):
-        """
-        Print the board in the command line
-        :return: nothing
-        """
-        for i in range(len(self.game.board)-1, -1, -1):
-            print('-----------------------------')
-            out = '| '
-            for j in range(0, len(self.game.board[0])):
-                if self.game.board[i, j] == CellState.X_Value:
-                    token = 'x'
-                elif self.game.board[i, j] == CellState.O_Value:
-                    token = 'o'
-                else:
-                    token = ' '
-                out += token + ' | '
-            print(out)
-        print('-----------------------------')
-
-    def showResult(self , message):
-        """
-        Method that prints the result of the game
-        :param message: message containing the winner
-        :return: nothing
-        """
-        print(message)
 
 
 class Game:
     def __init__(self, p1, p2):
         """
-        Initialize the game
+        Initialize the game on the board of the players
         :param p1: fist player -> the one that will do the first move (X)
         :param p2: second player (O)
         """
-        self.board = np.zeros((BOARD_ROWS, BOARD_COLS))
+        if p1.config is not p2.config:
+            raise ValueError("The players must play on the same board")
+        self.config = p1.config
+        self.board = np.zeros((self.config.rows, self.config.cols))
         self.player1 = p1
         self.player2 = p2
         self.isEnd = False
@@ -399,25 +52,55 @@ class Game:
 
         self.actionChose = None
 
+        # Zobrist hash of the board, updated at every action
+        self.zobrist = self.config.zobrist
+        self.hash = 0
+        # First free row of each column
+        self.heights = [0] * self.config.cols
+        # The flattened board and the cell of the last action: the game can end only on a line through it
+        self.cells = [CellState.empty_Value] * self.config.cells
+        self.lastCell = None
+        # Columns not full, updated in place at every action
+        self.openColumns = list(range(self.config.cols))
+
+        # Buffers reused by every game of the training: the content of a new game and the hashes of the children
+        self.emptyCells = tuple(self.cells)
+        self.emptyHeights = tuple(self.heights)
+        self.allColumns = tuple(self.openColumns)
+        self.childHashBuffer = [0] * self.config.cols
+
+        # LatencyRecorder of the games with a human player (None if the latencies are not recorded)
+        self.latency = None
+
     def getHash(self):
         """
         :return: the hash of the current board
         """
-        boardHash = str(self.board.reshape(BOARD_COLS * BOARD_ROWS))
-        return boardHash
+        return self.hash
+
+    def childHashes(self, positions, symbol, out=None):
+        """
+        Method that derives from the current hash the hash of the board after each possible action
+        :param positions: list of the available columns
+        :param symbol: symbol of the player that performs the action
+        :param out: list (with at least one element for each position) in which the hashes are written
+            (None to return a new list)
+        :return: a list with the hash of the board after the action in each column
+        """
+        if out is not None:
+            for i, y in enumerate(positions):
+                out[i] = childHash(self.hash, self.zobrist, self.heights[y] * self.config.cols + y, symbol)
+            return out
+        return [childHash(self.hash, self.zobrist, self.heights[y] * self.config.cols + y, symbol)
+                for y in positions]
 
     def availablePositions(self):
         """
         Check which positions are available
         :return: a list containing all the available columns for perform an action
         """
-        positions = []
-        for i in range(BOARD_COLS):
-            # If the column i is not complete, an action can be done on that column
-            if self.board[BOARD_ROWS-1, i] == CellState.empty_Value:
-                # Append the column that is not full
-                positions.append(i)
-        return positions
+        # The columns not full are kept updated
+        return list(self.openColumns)
 
     def updateState(self , position):
         """
@@ -429,6 +112,14 @@ class Game:
         position = (self.get_available_x(position), position)
         # Update the state
         self.board[position] = CellState(self.activePlayer.symbol)
+        cell = position[0] * self.config.cols + position[1]
+        self.cells[cell] = int(self.activePlayer.symbol)
+        self.lastCell = cell
+        # Update the hash with the key of the cell
+        self.hash = (self.hash ^ self.zobrist[cell][pieceIndex(self.activePlayer.symbol)]) + PLY_UNIT
+        self.heights[position[1]] += 1
+        if self.heights[position[1]] == self.config.rows:
+            self.openColumns.remove(position[1])
 
     def get_available_x(self, y):
         """
@@ -436,12 +127,10 @@ class Game:
         :param y: is the columns chosen
         :return: the x coordinate
         """
-        # Check all the position in the column selected starting from the base
+        # The first free row is kept updated for each column
         # print("In get_available_x y is:", y)
-        for x in range(BOARD_ROWS):
-            if self.board[x, y] == CellState.empty_Value:
-                # print("Chosen x: ", x)
-                return x
+        if self.heights[y] < self.config.rows:
+            return self.heights[y]
 
     def updateActivePlayer(self):
         """
@@ -453,53 +142,23 @@ class Game:
         else:
             self.activePlayer = self.player1
 
-    def winner_check(self, x, y, x_dir, y_dir):
-        """
-        Method that check if there are 4 symbols in a line
-        :param x: is the x coordinates of the point to check
-        :param y: is the y coordinates of the point to check
-        :param x_dir: is the x direction of the line to check: 0 vertical, 1 go up
-        :param y_dir: is the y direction of the line to check: 0 horizontal, 1 go up
-        :return: +4/-4 if a user won, something else otherwise
-        """
-
-        # If the check will exceed the board limits
-        if x + 3 * x_dir >= self.board.shape[0] or y + 3 * y_dir >= self.board.shape[1] or\
-                x + 3 * x_dir < 0 or y + 3 * y_dir < 0:
-            return 0
-
-        result = 0
-
-        for i in range(4):
-            # Add the value of the next cell in the line to check
-            result += self.board[x + i * x_dir, y + i * y_dir]
-
-        return result
-
     def winner(self):
         """
         Check the board and search for end game conditions
         :return: a GameState value referred to the first player (self.player1)
         """
 
-        # Check if someone won
-        for x in range(BOARD_ROWS):
-            for y in range(BOARD_COLS):
-                if self.board[x, y] != CellState.empty_Value:
-                    # If the first player won
-                    if self.winner_check(x, y, 1, 0) == 4 or self.winner_check(x, y, 0, 1) == 4 or \
-                            self.winner_check(x, y, 1, 1) == 4 or self.winner_check(x, y, -1, 1) == 4:
-                        self.isEnd = True
-                        return GameState.WIN
-                    # If the second player won
-                    if self.winner_check(x, y, 1, 0) == -4 or self.winner_check(x, y, 0, 1) == -4 or \
-                            self.winner_check(x, y, 1, 1) == -4 or self.winner_check(x, y, -1, 1) == -4:
-                        self.isEnd = True
-                        return GameState.LOOSE
+        # Check if the last action completed a line: only the lines through its cell are checked
+        if self.lastCell is not None:
+            symbol = self.cells[self.lastCell]
+            if self.config.completesLine(self.cells, self.lastCell, symbol):
+                self.isEnd = True
+                # If the first player won, otherwise the second one
+                return GameState.WIN if symbol == CellState.X_Value else GameState.LOOSE
 
         # Check if it is a draw
         # Tie -> no available position
-        if len(self.availablePositions()) == 0:
+        if not self.openColumns:
             self.isEnd = True
             return GameState.DRAW
 
@@ -533,46 +192,71 @@ class Game:
 
         # Back propagate rewards
         if result == GameState.WIN:
-            if type(self.player1) == Player.ArtificialPlayer:
+            if isinstance(self.player1, Player.ArtificialPlayer):
                 self.player1.feedReward(2)
             else:
                 self.player2.feedReward(-2)
         elif result == GameState.LOOSE:
-            if type(self.player1) == Player.ArtificialPlayer:
+            if isinstance(self.player1, Player.ArtificialPlayer):
                 self.player1.feedReward(-2)
             else:
                 self.player2.feedReward(2)
         else:
-            if type(self.player1) == Player.ArtificialPlayer:
+            if isinstance(self.player1, Player.ArtificialPlayer):
                 self.player1.feedReward(1)
             else:
                 self.player2.feedReward(1)
 
-    def reset(self):
+    def reset(self, start=None):
         """
         Reset the variable to start a new game
+        :param start: list of the columns chosen to reach the position from which the game starts
+            (None to start from the empty board), the actions are not remembered by the players
         :return: nothing
         """
-        self.board = np.zeros((BOARD_ROWS , BOARD_COLS))
+        # The buffers are reset in place
+        self.board.fill(CellState.empty_Value)
         self.isEnd = False
         self.activePlayer = self.player1
-
-    def play(self , client , rounds = 100):
+        self.hash = 0
+        self.heights[:] = self.emptyHeights
+        self.cells[:] = self.emptyCells
+        self.openColumns[:] = self.allColumns
+        self.lastCell = None
+        if start is not None:
+            for y in start:
+                self.updateState(y)
+                self.updateActivePlayer()
+
+    def play(self , client , rounds = 100 , checkpointer = None , startRound = 0 , startPool = None ,
+             startRate = 0 , monitor = None):
         """
         Method that handles the game both in case of ArtificialPlayer against artificialPlayer and
             ArtificialPlayer against HumanPlayer
         :param client: generic client for the interaction with the user (cli or gui)
         :param rounds: number of game to play in case of training games
-        :return: nothing
-        """
-        if type(self.player1) == ArtificialPlayer and type(self.player2) == ArtificialPlayer:
+        :param checkpointer: Checkpointer used to save periodically the policies during the training (optional)
+        :param startRound: number of training games already played (when the training is resumed)
+        :param startPool: StartPool with the positions from which the training games can start (optional)
+        :param startRate: probability that a training game starts from a position of the pool
+        :param monitor: ConvergenceMonitor that stops the training when the policies don't change anymore (optional)
+        :return: the reason why the training stopped before the last game, None otherwise
+        """
+        if isinstance(self.player1, ArtificialPlayer) and isinstance(self.player2, ArtificialPlayer):
+            from tqdm import tqdm
             # If training play
-            for i in tqdm(range(rounds)):
+            for i in tqdm(range(startRound, rounds), initial=startRound, total=rounds):
+                # Exploring starts: begin from a position rarely updated
+                if startPool is not None and np.random.uniform(0, 1) < startRate:
+                    self.reset(startPool.choose(self.player1, self.player2))
                 while not self.isEnd:
-                    # Take the available positions
-                    positions = self.availablePositions()
+                    # Take the available positions (the list is updated in place by updateState)
+                    positions = self.openColumns
+                    # Hashes of the boards after each action
+                    childHashes = self.childHashes(positions, self.activePlayer.symbol, self.childHashBuffer)
                     # Choose the action
-                    action = self.activePlayer.chooseAction(positions , self.board)
+                    action = self.activePlayer.chooseAction(positions , self.board , childHashes , self.cells ,
+                                                            self.heights , self.hash)
                     # Update the board
                     self.updateState(action)
                     self.activePlayer.addState(self.getHash())
@@ -589,20 +273,32 @@ class Game:
                     else:
                         # Update the active player for the next turn
                         self.updateActivePlayer()
+                # Stop if the policies converged
+                if monitor is not None:
+                    reason = monitor.gameEnded(i + 1)
+                    if reason is not None:
+                        return reason
+                # Save a checkpoint if it's time to do it (after the monitor: the checkpoint includes this game)
+                if checkpointer is not None:
+                    checkpointer.maybeSave(i + 1)
+            return None
         else:
             # If it is a humanPlayer
             while not self.isEnd:
                 # Take the available positions
                 positions = self.availablePositions()
+                # The latencies are grouped by phase of the game
+                if self.latency is not None:
+                    self.latency.setPosition(sum(self.heights), self.config.cells)
 
                 if type(self.activePlayer) == HumanPlayer:
-                    if type(client) == CLI:
+                    if isinstance(client, CLI):
                         client.showBoard()
                         action = self.activePlayer.chooseAction(positions)
                     else:
                         client.showBoard()
                         # Update the window
-                        mainWindow.mainloop()
+                        client.waitEvents()
 
                         if self.actionChose == "exit":
                             return
@@ -612,7 +308,10 @@ class Game:
                         self.actionChose = None
                 else:
                     # If artificial player
-                    action = self.activePlayer.chooseAction(positions , self.board)
+                    childHashes = self.childHashes(positions, self.activePlayer.symbol)
+                    with measure(self.latency, self.activePlayer, "chooseAction"):
+                        action = self.activePlayer.chooseAction(positions , self.board , childHashes ,
+                                                                boardHash=self.hash)
                     # Get the pair (x,y) and save it
                     client.last_action = (self.get_available_x(action), action)
                 # Update the board
@@ -623,7 +322,9 @@ class Game:
                 winner = self.winner()
                 if winner is not GameState.UNDEFINED:
                     # Give the rewards to the artificial player
-                    self.giveRewards_with_human()
+                    artificialPlayer = self.player1 if isinstance(self.player1, ArtificialPlayer) else self.player2
+                    with measure(self.latency, artificialPlayer, "giveRewards", "end"):
+                        self.giveRewards_with_human()
                     client.showBoard()
                     if winner is GameState.WIN:
                         message = str(self.player1.name) + " won!"
@@ -633,9 +334,8 @@ class Game:
                         message = "Tie!"
                     # Show the result on the client (cli or gui)
                     client.showResult(message)
-                    if type(client) == GUI:
-                        # If gui, update the window to visualize the message
-                        mainWindow.mainloop()
+                    # If gui, update the window to visualize the message
+                    client.waitEvents()
                     # Back propagate the reward
                     self.giveRewards()
                     break
@@ -657,9 +357,11 @@ class Game:
             return "Invalid position"
 
 
-def start_game():
+def start_game(game, client):
     """
     Method called for starting a re-starting the game
+    :param game: the game
+    :param client: the client showing the game (cli or gui)
     :return: nothing
     """
     # If the game is already started
@@ -670,146 +372,301 @@ def start_game():
         game.play(client)
 
 
-def exit_game():
+def exit_game(game, client):
     """
     Method called when the user select the "Exit" option from the Menu
+    :param game: the game
+    :param client: the gui
     :return: nothing
     """
     game.actionChose = "exit"
-    mainWindow.destroy()
+    client.mainWindow.destroy()
+
+
+def saveHumanGamePolicy(artificialPlayer, latency):
+    """
+    Method that saves the policy of the artificial player at the end of the games with a human player
+    If a new version was saved after the policy was loaded (e.g. by a training) the new version is kept
+    :param artificialPlayer: the artificial player
+    :param latency: the LatencyRecorder of the game (None if the latencies are not recorded)
+    :return: nothing
+    """
+    if artificialPlayer.policyReplaced():
+        print("The policy " + artificialPlayer.policyFile() + " changed after it was loaded: not saved")
+        return
+    with measure(latency, artificialPlayer, "savePolicy", "end"):
+        artificialPlayer.savePolicy()
 
 
-def on_quit():
+def on_quit(game):
     """
     Method called when the window is closed
+    :param game: the game
     :return: nothing
     """
     # Save the result of the game with the human player
-    if type(player1) is not None and type(player2) is not None:
-        if type(player1) == ArtificialPlayer:
-            player1.savePolicy()
-        else:
-            player2.savePolicy()
+    artificialPlayer = game.player1 if isinstance(game.player1, ArtificialPlayer) else game.player2
+    saveHumanGamePolicy(artificialPlayer, game.latency)
+    # The memory used by the game, before exit() releases it (see Profiling)
+    snapshotMemory()
     exit()
 
 
+def parseArguments():
+    """
+    Method that reads the input arguments
+    :return: the parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Four in a line game")
+    parser.add_argument("mode", nargs="?", default="cli", choices=["cli", "gui", "training", "analyze"],
+                        help="play from the command line, with the gui, train the artificial players "
+                             "or analyse a file of positions")
+    parser.add_argument("games", nargs="?", type=int, default=1000,
+                        help="number of games in the training")
+    parser.add_argument("--rows", type=int, default=BOARD_ROWS, help="number of rows of the board")
+    parser.add_argument("--cols", type=int, default=BOARD_COLS, help="number of columns of the board")
+    parser.add_argument("--k", type=int, default=LINE_LENGTH, help="number of symbols in a line to win")
+    parser.add_argument("--checkpoint-games", type=int, default=None,
+                        help="save a training checkpoint every N games")
+    parser.add_argument("--checkpoint-seconds", type=float, default=None,
+                        help="save a training checkpoint every T seconds")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the training from the last checkpoint")
+    parser.add_argument("--move-cache", type=int, default=0,
+                        help="remember up to N positions with the action chosen by the artificial player")
+    parser.add_argument("--ntuple", action="store_true",
+                        help="use artificial players whose value function is an n-tuple network")
+    parser.add_argument("--sharded-policy", action="store_true",
+                        help="save the policies in one shard for each ply, read only when needed")
+    parser.add_argument("--policy-memory", type=int, default=None,
+                        help="with --sharded-policy, unload the shards not changed when more than N states "
+                             "are in memory")
+    parser.add_argument("--serving-policy", action="store_true",
+                        help="play with the policy compacted by PolicyCompact.py (games with a human player)")
+    parser.add_argument("--exploring-starts", type=float, default=0,
+                        help="probability that a training game starts from a position in the middle of the game")
+    parser.add_argument("--start-pool", type=int, default=10000,
+                        help="number of positions from which the training games can start")
+    parser.add_argument("--start-games", default=None,
+                        help="file with logged games (one sequence of columns for each line) from which the start "
+                             "positions are taken (by default they are reached with random games)")
+    parser.add_argument("--watch-policy", type=float, default=None, metavar="SECONDS",
+                        help="check the policy file every SECONDS seconds and use the new versions from the next "
+                             "action (games with a human player)")
+    parser.add_argument("--stop-window", type=int, default=None,
+                        help="stop the training when the policies converged over the last N games")
+    parser.add_argument("--stop-value-change", type=float, default=1e-3,
+                        help="convergence threshold of the mean absolute change of the values in each update")
+    parser.add_argument("--stop-new-states", type=float, default=0.01,
+                        help="convergence threshold of the number of new states for each state updated")
+    parser.add_argument("--stop-score", type=float, default=None,
+                        help="convergence threshold of the distance from 0.5 of the score against the policies "
+                             "of N games before (by default not measured)")
+    parser.add_argument("--evaluation-games", type=int, default=100,
+                        help="number of games played against the policies of N games before")
+    parser.add_argument("--exp-decay", type=float, default=None,
+                        help="when the policies converged, multiply the exploration rate by this factor instead "
+                             "of stopping (the training stops when it's under 0.01)")
+    parser.add_argument("--latency", nargs="?", const="", default=None, metavar="FILE",
+                        help="record the latency of the operations of the artificial player in the games with a "
+                             "human player and save the histograms at the exit (by default in "
+                             "Files/latency_<process id>.json, see Latency.py to merge them)")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="REPORT",
+                        help="run with the profiler and the memory tracer and write the hotspots report "
+                             "(by default in Files/profile_<mode>.txt)")
+    parser.add_argument("--input", default=None,
+                        help="file of the positions to analyse (standard input if missing)")
+    parser.add_argument("--output", default=None,
+                        help="file of the results of the analysis (standard output if missing)")
+    parser.add_argument("--batch-size", type=int, default=10000,
+                        help="number of positions analysed together")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="number of worker processes of the analysis")
+    arguments = parser.parse_args()
+    if arguments.sharded_policy and arguments.ntuple:
+        parser.error("--sharded-policy is available only for the lookup table")
+    if arguments.serving_policy and arguments.ntuple:
+        parser.error("--serving-policy is available only for the lookup table")
+    if arguments.mode == "analyze" and arguments.ntuple:
+        parser.error("the analysis is available only for the lookup table")
+    try:
+        arguments.config = boardConfig(arguments.rows, arguments.cols, arguments.k)
+    except ValueError as error:
+        parser.error(str(error))
+    if arguments.latency == "":
+        arguments.latency = "Files/latency_" + str(os.getpid()) + ".json"
+    if arguments.profile == "":
+        arguments.profile = "Files/profile_" + arguments.mode + ".txt"
+    return arguments
+
+
+def training(arguments):
+    """
+    Training Mode: the two artificial players play against each other
+    :param arguments: the input arguments
+    :return: nothing
+    """
+    # Tabular or n-tuple network value function
+    artificialPlayerType = NTupleArtificialPlayer if arguments.ntuple else ArtificialPlayer
+
+    player1 = artificialPlayerType("U-0318", CellState.X_Value, config=arguments.config)
+    player2 = artificialPlayerType("U-0314", CellState.O_Value, config=arguments.config)
+    if arguments.sharded_policy:
+        player1.useShardedPolicy(arguments.policy_memory)
+        player2.useShardedPolicy(arguments.policy_memory)
+
+    # If the file exists, upload it
+    if player1.policyExists():
+        player1.loadPolicy(player1.policyFile())
+    if player2.policyExists():
+        player2.loadPolicy(player2.policyFile())
+
+    # Perfect play in the endgame if the tablebase was generated
+    player1.tablebase = player2.tablebase = loadTablebase(arguments.config)
+
+    # Create the game
+    game = Game(player1, player2)
+
+    # Positions from which the training games can start
+    # The pool is built before the checkpoint is restored: it uses the random generator
+    startPool = None
+    checkpointParts = {}
+    if arguments.exploring_starts > 0:
+        from StartPositions import StartPool
+        startPool = StartPool(arguments.config, arguments.start_pool, arguments.start_games)
+        checkpointParts["startPool"] = startPool
+
+    # Early stop when the policies converged
+    monitor = None
+    if arguments.stop_window is not None:
+        from Convergence import ConvergenceMonitor
+        monitor = ConvergenceMonitor(player1, player2, arguments.stop_window, arguments.stop_value_change,
+                                     arguments.stop_new_states, arguments.stop_score, arguments.evaluation_games,
+                                     arguments.exp_decay)
+        checkpointParts["monitor"] = monitor
+
+    # Restore the policies and the number of games from the last checkpoint
+    startRound = 0
+    if arguments.resume:
+        startRound = resumeCheckpoint([player1, player2], CHECKPOINT_PATH + arguments.config.tag, checkpointParts)
+
+    checkpointer = None
+    if arguments.checkpoint_games is not None or arguments.checkpoint_seconds is not None:
+        checkpointer = Checkpointer([player1, player2], CHECKPOINT_PATH + arguments.config.tag,
+                                    everyGames=arguments.checkpoint_games,
+                                    everySeconds=arguments.checkpoint_seconds, parts=checkpointParts)
+        checkpointer.setStart(startRound)
+
+    print("Training...")
+    reason = game.play(None, arguments.games, checkpointer, startRound, startPool, arguments.exploring_starts,
+                       monitor)
+    if reason is not None:
+        print("\nTraining stopped: converged " + reason)
+    # The memory used by the policies, while the players are alive (see Profiling)
+    snapshotMemory()
+
+    # Wait for the last checkpoint before writing the final policies
+    if checkpointer is not None:
+        checkpointer.finish()
+
+    # Save the configurations
+    player1.savePolicy()
+    player2.savePolicy()
+
+
+def humanGame(arguments):
+    """
+    With Human Player Mode: a human player against an artificial player, using the cli or the gui
+    :param arguments: the input arguments
+    :return: nothing
+    """
+    withGui = arguments.mode == "gui"
+    # Tabular or n-tuple network value function
+    artificialPlayerType = NTupleArtificialPlayer if arguments.ntuple else ArtificialPlayer
+
+    # Choose randomly the first player, the name will be set later
+    if rand() < 0.5:
+        player1 = artificialPlayerType("U-0318" , CellState.X_Value , 0, config=arguments.config)
+        player2 = HumanPlayer("" , CellState.O_Value, arguments.config)
+        artificialPlayer, humanPlayer = player1, player2
+    else:
+        player1 = HumanPlayer("", CellState.X_Value, arguments.config)
+        player2 = artificialPlayerType("U-0314" , CellState.O_Value , 0, config=arguments.config)
+        artificialPlayer, humanPlayer = player2, player1
+    artificialPlayer.servingPolicy = arguments.serving_policy
+    if arguments.sharded_policy:
+        artificialPlayer.useShardedPolicy(arguments.policy_memory)
+
+    # Histograms of the latencies, saved at the exit (also when the window is closed)
+    latency = None
+    if arguments.latency is not None:
+        latency = artificialPlayer.latency = LatencyRecorder()
+        atexit.register(latency.dump, arguments.latency)
+
+    # Load the policy while the user inserts the name: the first action of the artificial player waits for it
+    artificialPlayer.loadPolicyInBackground(artificialPlayer.policyFile())
+    # Use the policies saved by the training while the game is running
+    if arguments.watch_policy is not None:
+        artificialPlayer.watchPolicy(arguments.watch_policy)
+
+    if not withGui:
+        print("Four in a line!")
+        humanPlayer.setName(input("Insert your name: "))
+        print("Starting the game...")
+        if humanPlayer.symbol == CellState.O_Value:
+            print("Your symbol is: O")
+        else:
+            print("Your symbol is: X")
+
+    # Perfect play in the endgame if the tablebase was generated
+    artificialPlayer.tablebase = loadTablebase(arguments.config)
+
+    # Cache of the actions of the artificial player (it never explores)
+    if arguments.move_cache > 0:
+        artificialPlayer.enableMoveCache(arguments.move_cache,
+                                         "Files/movecache_" + artificialPlayer.name + arguments.config.tag)
+
+    # Create and start the game
+    game = Game(player1 , player2)
+    game.latency = latency
+
+    if withGui:
+        from Gui import createGui
+        client = createGui(game, lambda: start_game(game, client), lambda: exit_game(game, client),
+                           lambda: on_quit(game))
+        # Start the GUI: wait for the name of the player
+        client.waitEvents()
+    else:
+        client = CLI(game)
+
+    # Start the game
+    start_game(game, client)
+
+    # Uncomment to train the algorithm when it's playing with you
+    # Save the result of the game with the human player
+    saveHumanGamePolicy(artificialPlayer, latency)
+    if artificialPlayer.moveCache is not None:
+        print(artificialPlayer.moveCache.statistics())
+    # The memory used by the game, while the players are alive (see Profiling)
+    snapshotMemory()
+
+
 if __name__ == '__main__':
 
     # Read the input arguments to decide if gui, cli or training (plus how many training game)
-    if len(sys.argv) > 1 and sys.argv[1] == "gui":
-        withGui = True
-        training = False
-    elif len(sys.argv) > 1 and sys.argv[1] == "training":
-        withGui = False
-        training = True
-        try:
-            # If it's an integer
-            numberOfGames = int(sys.argv[2])
-        except :
-            numberOfGames = 1000
-
+    arguments = parseArguments()
+    if arguments.mode == "training":
+        run = lambda: training(arguments)
+    elif arguments.mode == "analyze":
+        from Analysis import analyzeFile
+        run = lambda: analyzeFile(arguments.input, arguments.output, arguments.batch_size, arguments.processes,
+                                  arguments.config, arguments.sharded_policy, arguments.policy_memory)
     else:
-        withGui = False
-        training = False
-
-    if training:
-        """Training Mode"""
-        player1 = ArtificialPlayer("U-0318", CellState.X_Value)
-        player2 = ArtificialPlayer("U-0314", CellState.O_Value)
-
-        # If the file exists, upload it
-        my_file = Path("Files/policy_U-0318")
-        if my_file.is_file():
-            player1.loadPolicy("Files/policy_U-0318")
-        # If the file exists, upload it
-        my_file = Path("Files/policy_U-0314")
-        if my_file.is_file():
-            player2.loadPolicy("Files/policy_U-0314")
-
-        # Create the game
-        game = Game(player1, player2)
-
-        print("Training...")
-        game.play(None, numberOfGames)
-
-        # Save the configurations
-        player1.savePolicy()
-        player2.savePolicy()
-    else:
-        """With Human Player Mode"""
-        if withGui:
-            # The name will be set later through the GUI
-            name = ""
-        else:
-            print("Four in a line!")
-            name = input("Insert your name: ")
-            print("Starting the game...")
-
-        # Choose randomly the first player
-        if rand() < 0.5:
-            player1 = ArtificialPlayer("U-0318" , CellState.X_Value , 0)
-            player2 = HumanPlayer(name , CellState.O_Value)
-            player1.loadPolicy("Files/policy_U-0318")
-            if not withGui:
-                print("Your symbol is: O")
-        else:
-            player1 = HumanPlayer(name, CellState.X_Value)
-            player2 = ArtificialPlayer("U-0314" , CellState.O_Value , 0)
-            player2.loadPolicy("Files/policy_U-0314")
-            if not withGui:
-                print("Your symbol is: X")
-
-        # Create and start the game
-        game = Game(player1 , player2)
-
-        if withGui:
-            # Create the main window
-            mainWindow = Tk()
-            # Set the title
-            mainWindow.title('Four in a line Game')
-            # Take the position in the middle of the screen
-            screenPositionRight = int(mainWindow.winfo_screenwidth() / 2 - 700 / 2)
-            screenPositionDown = int(mainWindow.winfo_screenheight() / 2 - 650 / 2)
-            # Set the size of the window and its position
-            mainWindow.geometry("800x650" + "+{}+{}".format(screenPositionRight, screenPositionDown))
-            # Set the window not resizable
-            mainWindow.resizable(False , False)
-
-            # Create the image of the starting phase
-            init_image = PhotoImage(
-                file=relative_to_assets("4_in_a_line_game.png")
-            )
-
-            client = GUI(game , mainWindow)
-
-            # Add menu to the window
-            menubar = Menu(mainWindow)
-            fileMenu = Menu(menubar, tearoff=0)
-            # Add the "New Game" option
-            fileMenu.add_command(label="New Game", command= lambda : start_game())
-
-            fileMenu.add_separator()
-
-            # Add the "Exit" option
-            fileMenu.add_command(label="Exit", command= lambda : exit_game())
-
-            menubar.add_cascade(label="File", menu=fileMenu)
-            mainWindow.config(menu=menubar)
-
-            # Set the action in case of closure -> close the entire application
-            mainWindow.protocol("WM_DELETE_WINDOW", on_quit)
-
-            # Start the GUI
-            mainWindow.mainloop()
-        else:
-            client = CLI(game)
+        run = lambda: humanGame(arguments)
 
-        # Start the game
-        start_game()
-
-        # Uncomment to train the algorithm when it's playing with you
-        # Save the result of the game with the human player
-        if type(player1) == ArtificialPlayer:
-            player1.savePolicy()
-        else:
-            player2.savePolicy()
+    if arguments.profile is not None:
+        # The global snapshotMemory becomes the one of the profiler
+        from Profiling import runProfiled, snapshotMemory
+        runProfiled(run, arguments.profile)
+    else:
+        run()
@@ -0,0 +1,389 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+"""
+
+from pathlib import Path
+from tkinter import Tk, Canvas, Entry, Button, PhotoImage, Message, Menu
+
+from Enumerations import CellState
+from Player import HumanPlayer
+from Client import Client
+
+# For rebuild the path of the images
+OUTPUT_PATH = Path(__file__).parent
+ASSETS_PATH = OUTPUT_PATH / Path("./Files/Images")
+
+# Starting coordinates of the board in the gui
+X_ZERO_POSITION = 500
+Y_ZERO_POSITION = 600
+
+# Dimension of each button (cell) in the gui
+DIM_CELL_X = 75
+DIM_CELL_Y = 75
+
+# Highest point of the board in the gui (under the names of the players)
+TOP_BOARD_POSITION = 100
+
+
+def relative_to_assets(path: str) -> Path:
+    """
+    Method that rebuilds the path of all the pictures
+    :param path: picture name
+    :return: complete path
+    """
+    return ASSETS_PATH / Path(path)
+
+
+class GUI(Client):
+    def __init__(self , g , w):
+
+        # Save the game
+        self.game = g
+
+        # Save the last action: pair (x, y)
+        self.last_action = None
+
+        # The cells of the bigger boards are smaller, so that the board always fits in the window
+        rows, cols = g.board.shape
+        self.cellSize = min(DIM_CELL_X, (X_ZERO_POSITION + DIM_CELL_X - TOP_BOARD_POSITION) // rows,
+                            (Y_ZERO_POSITION + DIM_CELL_Y) // cols)
+
+        # Create the main window
+        self.mainWindow = w
+
+        # Create the workspace
+        self.canvas = Canvas(
+            self.mainWindow,
+            height=900,
+            width=900,
+            bd=0,
+            bg="#FAF8F5",
+            highlightthickness=0,
+            relief="ridge"
+        )
+        self.canvas.place(
+            x=0,
+            y=0
+        )
+
+        # List of elements in the page
+        self.elementsInThePage = []
+
+        # Variable that contains the error, if there is one
+        self.error = None
+
+        # Create the image of the starting phase (it must be kept to be shown)
+        self.initImage = PhotoImage(
+            file=relative_to_assets("4_in_a_line_game.png")
+        )
+
+        # Initialize the starting page
+        self.init_starting_page()
+
+    def showError(self):
+        """
+        Method that shows the error
+        :return: nothing
+        """
+        errorMessage = Message(
+            self.mainWindow,
+            text=self.error,
+            width=200,
+            foreground="red",
+            bg = "#FAF8F5"
+        )
+        errorMessage.place(
+            x=300,
+            y=700
+        )
+        self.elementsInThePage.append(errorMessage)
+
+    def init_starting_page(self):
+        """
+        Method that inits the starting page
+        :return: nothing
+        """
+
+        if self.error is not None:
+            self.showError()
+
+        welcomeMessage = Message(
+            self.mainWindow,
+            text="Welcome in 4 in a line Game!",
+            bg="#FAF8F5",
+            width=200
+        )
+        welcomeMessage.place(
+            x=300,
+            y=30
+        )
+
+        self.elementsInThePage.append(welcomeMessage)
+
+        self.canvas.create_image(
+            250,
+            100,
+            image=self.initImage,
+            anchor="nw"
+        )
+
+        # Create the entry for the player's name under the image
+        nameMessage = Message(
+            self.mainWindow,
+            width=50,
+            bg="#FAF8F5",
+            text="Name:"
+        )
+        nameMessage.place(
+            x=300,
+            y=450
+        )
+
+        self.elementsInThePage.append(nameMessage)
+
+        nameEntry = Entry(
+            bd=0,
+            bg="#ffffff",
+            highlightthickness=0
+        )
+        nameEntry.place(
+            x=350,
+            y=450,
+            width=91.0,
+            height=17.0
+        )
+
+        self.elementsInThePage.append(nameEntry)
+
+        # Add the start game button
+        startGame_button = Button(
+            borderwidth=100,
+            highlightthickness=0,
+            text="Start Game",
+            command=lambda: self.startGame(nameEntry),
+            relief="flat"
+        )
+        startGame_button.place(
+            x=330,
+            y=500,
+            width=114,
+            height=30
+        )
+
+        self.elementsInThePage.append(startGame_button)
+
+    def startGame(self, nameEntry):
+        """
+        Method called clicking on startGame_button in the starting page
+        If the user inserted the name, the game will start , otherwise show the error
+        :return: nothing
+        """
+        # Get the name inserted before deleting the elements
+        nameInserted = nameEntry.get()
+
+        # Delete elements in the current page
+        self.canvas.delete("all")
+        for i in range(len(self.elementsInThePage)):
+            self.elementsInThePage[i].destroy()
+        self.elementsInThePage = []
+
+        # Check if the name is valid, otherwise show an error
+        if nameInserted is None or not nameInserted:
+            self.error = "Insert your name!"
+            self.init_starting_page()
+            return
+        self.error = None
+
+        # print("Name inserted: ", nameInserted)
+
+        # Update the name of the human player
+        if type(self.game.player1) == HumanPlayer:
+            self.game.player1.name = nameInserted
+        else:
+            self.game.player2.name = nameInserted
+
+        # Stop the mainloop
+        self.mainWindow.quit()
+
+    def showBoard(self):
+        """
+        Print the board
+        :return: nothing
+        """
+        # Stop the previous mainloop
+        self.mainWindow.quit()
+
+        # Delete all the previous elements
+        for i in range(len(self.elementsInThePage)):
+            self.elementsInThePage[i].destroy()
+        self.elementsInThePage = []
+
+        # Show the error if present
+        if self.error is not None:
+            self.showError()
+
+        # Build the message with players and their symbols
+        messageToShow = str(self.game.player1.name) + "(X)      VS      " + str(self.game.player2.name) + "(O)"
+
+        infoMessage = Message(
+            self.mainWindow,
+            text=messageToShow,
+            font="Helvetica 12 bold",
+            width=400,
+            foreground="black",
+            bg = "#FAF8F5"
+        )
+        infoMessage.place(
+            x=300,
+            y=40
+        )
+        self.elementsInThePage.append(infoMessage)
+
+        # Build the board with CellButton elements
+        for row in range(len(self.game.board)):
+            for col in range(len(self.game.board[0])-1, -1, -1):
+                if (row, col) != self.last_action:
+                    color = 'black'
+                else:
+                    color = 'red'
+                cell = CellButton(self, row, col, self.game.board[row][col], color)
+                self.elementsInThePage.append(cell)
+
+    def actionChose(self, y):
+        """
+        Method called when a button cell is clicked
+        :param y: is the coordinate y of the button in the board
+        :return: nothing
+        """
+        if self.game is not None:
+            self.error = self.game.setActionChose(y)
+            # If the action was valid
+            if self.error is None:
+                self.mainWindow.quit()
+            else:
+                self.showBoard()
+                self.mainWindow.mainloop()
+
+    def waitEvents(self):
+        """
+        Method that gives the control to the window until the user performs an action
+        :return: nothing
+        """
+        self.mainWindow.mainloop()
+
+    def showResult(self , message):
+        """
+        Method that prints the result of the game
+        :param message: message containing the winner
+        :return: nothing
+        """
+        self.mainWindow.quit()
+        resultMessage = Message(
+            self.mainWindow,
+            text=message,
+            font="Helvetica 12 bold",
+            width=200,
+            foreground="red",
+            bg = "#FAF8F5"
+        )
+        resultMessage.place(
+            x=330,
+            y=60
+        )
+        self.elementsInThePage.append(resultMessage)
+
+
+class CellButton:
+    def __init__(self, gui, x, y, cellSymbol, color='black'):
+        """
+        Initialize the object CellButton
+        :param gui: is the gui in which the object is
+        :param x: is the x position of the button in the board
+        :param y: is the y position of the button in the board
+        :param cellSymbol: is the value of the cell corresponding to the button
+        :param color: it is red for showing the last action of the artificial player
+        """
+        self.x = x
+        self.y = y
+        self.gui = gui
+
+        if cellSymbol == CellState.X_Value:
+            self.symbol = "X"
+        elif cellSymbol == CellState.O_Value:
+            self.symbol = "O"
+        else:
+            self.symbol = ""
+
+        self.cell = Button(
+            borderwidth=2,
+            highlightthickness=3,
+            relief="solid",
+            text = self.symbol,
+            fg=color,
+            font = "bold",
+            command=lambda: self.gui.actionChose(self.y)
+        )
+
+        # The bottom right corner of the board doesn't move with the size of the cells
+        size = self.gui.cellSize
+        self.cell.place(
+            y=X_ZERO_POSITION + DIM_CELL_X - (x + 1) * size,
+            x=Y_ZERO_POSITION + DIM_CELL_Y - (y + 1) * size,
+            width=size,
+            height=size
+        )
+
+    def destroy(self):
+        """
+        Method used to destroy the CellButton object as it was a tkinter object
+        :return: nothing
+        """
+        self.cell.destroy()
+
+
+def createGui(game, newGame, exitGame, quitGame):
+    """
+    Method that creates the main window with its menu and the gui of the game
+    :param game: the game to show
+    :param newGame: function called by the "New Game" option of the menu
+    :param exitGame: function called by the "Exit" option of the menu
+    :param quitGame: function called when the window is closed
+    :return: the GUI client
+    """
+    # Create the main window
+    mainWindow = Tk()
+    # Set the title
+    mainWindow.title('Four in a line Game')
+    # Take the position in the middle of the screen
+    screenPositionRight = int(mainWindow.winfo_screenwidth() / 2 - 700 / 2)
+    screenPositionDown = int(mainWindow.winfo_screenheight() / 2 - 650 / 2)
+    # Set the size of the window and its position
+    mainWindow.geometry("800x650" + "+{}+{}".format(screenPositionRight, screenPositionDown))
+    # Set the window not resizable
+    mainWindow.resizable(False , False)
+
+    client = GUI(game , mainWindow)
+
+    # Add menu to the window
+    menubar = Menu(mainWindow)
+    fileMenu = Menu(menubar, tearoff=0)
+    # Add the "New Game" option
+    fileMenu.add_command(label="New Game", command= lambda : newGame())
+
+    fileMenu.add_separator()
+
+    # Add the "Exit" option
+    fileMenu.add_command(label="Exit", command= lambda : exitGame())
+
+    menubar.add_cascade(label="File", menu=fileMenu)
+    mainWindow.config(menu=menubar)
+
+    # Set the action in case of closure -> close the entire application
+    mainWindow.protocol("WM_DELETE_WINDOW", quitGame)
+
+    return client
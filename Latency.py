@@ -0,0 +1,261 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+
+Latencies of the games with a human player: the time of each operation (action of the artificial player and its
+parts, loading and saving of the policy, rewards) is recorded in a histogram for each type of player, phase of the
+game and operation. The histograms have logarithmic buckets with linear sub-buckets (as HdrHistogram: the error is
+under 1.6% at every scale), so the histograms of different processes can be summed.
+
+Report of the histograms saved by one or more processes (optionally saving the merged histograms):
+    py Latency.py <file> <file> ... [--output <merged file>]
+"""
+
+import json
+import time
+import argparse
+from contextlib import contextmanager, nullcontext
+
+from Storage import replaceAtomically
+
+# Values under 2 * SUB_BUCKETS have their own bucket, then each power of 2 is split in SUB_BUCKETS buckets
+SUB_BUCKETS = 64
+SUB_BUCKET_BITS = 6
+
+# Percentiles in the reports
+PERCENTILES = (50, 95, 99)
+
+# Context manager returned by measure without recorder: shared, so nothing is allocated for each measure
+NO_MEASURE = nullcontext()
+
+
+def bucketIndex(value):
+    """
+    :param value: a non negative integer
+    :return: the index of the bucket of the value
+    """
+    if value < 2 * SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return shift * SUB_BUCKETS + (value >> shift)
+
+
+def bucketRange(index):
+    """
+    :param index: index of a bucket
+    :return: pair (lowest, highest) value of the bucket
+    """
+    if index < 2 * SUB_BUCKETS:
+        return index, index
+    shift = index // SUB_BUCKETS - 1
+    mantissa = index - shift * SUB_BUCKETS
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    def __init__(self):
+        """
+        Initialize an empty histogram of latencies (in microseconds)
+        """
+        # Bucket index -> number of values
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        """
+        Add a value to the histogram
+        :param value: latency in microseconds
+        :return: nothing
+        """
+        index = bucketIndex(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        """
+        Add the values of another histogram
+        :param other: the LatencyHistogram
+        :return: nothing
+        """
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent):
+        """
+        :param percent: percentile (0-100)
+        :return: the highest value of the bucket of the percentile (never above the maximum), 0 if empty
+        """
+        target = self.count * percent / 100
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(bucketRange(index)[1], self.max)
+        return self.max
+
+    def toDict(self):
+        """
+        :return: the histogram as a dictionary that can be saved in json
+        """
+        return {"counts": {str(index): count for index, count in self.counts.items()},
+                "count": self.count, "total": self.total, "max": self.max}
+
+    @staticmethod
+    def fromDict(data):
+        """
+        :param data: dictionary saved by toDict
+        :return: the LatencyHistogram
+        """
+        histogram = LatencyHistogram()
+        histogram.counts = {int(index): count for index, count in data["counts"].items()}
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.max = data["max"]
+        return histogram
+
+
+def gamePhase(ply, cells):
+    """
+    :param ply: number of symbols on the board
+    :param cells: number of cells of the board
+    :return: "opening" in the first third of the board, "middlegame" in the second one, "endgame" after
+    """
+    if ply * 3 < cells:
+        return "opening"
+    if ply * 3 < 2 * cells:
+        return "middlegame"
+    return "endgame"
+
+
+class LatencyRecorder:
+    def __init__(self):
+        """
+        Initialize the recorder, with a histogram for each (player type, phase, operation)
+        """
+        self.histograms = {}
+        # Phase of the game used for the next measures (see setPosition)
+        self.phase = "startup"
+
+    def setPosition(self, ply, cells):
+        """
+        Method called before each action: the phase of the game depends on the number of symbols on the board
+        :param ply: number of symbols on the board
+        :param cells: number of cells of the board
+        :return: nothing
+        """
+        self.phase = gamePhase(ply, cells)
+
+    def record(self, playerType, phase, operation, microseconds):
+        """
+        Add a latency
+        :param playerType: name of the class of the player
+        :param phase: phase of the game
+        :param operation: name of the operation
+        :param microseconds: the latency
+        :return: nothing
+        """
+        key = (playerType, phase, operation)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms.setdefault(key, LatencyHistogram())
+        histogram.record(microseconds)
+
+    @contextmanager
+    def measure(self, playerType, operation, phase=None):
+        """
+        Context manager that records the time of the code inside it
+        :param playerType: name of the class of the player
+        :param operation: name of the operation
+        :param phase: phase of the game (None for the phase of the current position)
+        """
+        phase = self.phase if phase is None else phase
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(playerType, phase, operation, (time.perf_counter_ns() - start) // 1000)
+
+    def merge(self, other):
+        """
+        Add the histograms of another recorder
+        :param other: the LatencyRecorder
+        :return: nothing
+        """
+        for key, histogram in other.histograms.items():
+            self.histograms.setdefault(key, LatencyHistogram()).merge(histogram)
+
+    def report(self):
+        """
+        :return: a table with count, mean, percentiles and maximum (in milliseconds) of each histogram
+        """
+        lines = ["{:<24} {:<11} {:<14} {:>8} {:>9} ".format("player", "phase", "operation", "count", "mean ms") +
+                 " ".join("{:>9}".format("p" + str(percent) + " ms") for percent in PERCENTILES) +
+                 " {:>9}".format("max ms")]
+        for (playerType, phase, operation), histogram in sorted(self.histograms.items()):
+            lines.append("{:<24} {:<11} {:<14} {:>8} {:>9.3f} ".format(
+                playerType, phase, operation, histogram.count, histogram.total / histogram.count / 1000) +
+                " ".join("{:>9.3f}".format(histogram.percentile(percent) / 1000) for percent in PERCENTILES) +
+                " {:>9.3f}".format(histogram.max / 1000))
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """
+        Save the histograms in json
+        :param path: path of the file
+        :return: nothing
+        """
+        data = [{"player": key[0], "phase": key[1], "operation": key[2], "histogram": histogram.toDict()}
+                for key, histogram in self.histograms.items()]
+        replaceAtomically(path, lambda file: file.write(json.dumps(data).encode()))
+
+
+def loadRecorder(path):
+    """
+    Read the histograms saved by LatencyRecorder.dump
+    :param path: path of the file
+    :return: the LatencyRecorder
+    """
+    recorder = LatencyRecorder()
+    with open(path) as file:
+        for entry in json.load(file):
+            recorder.histograms[(entry["player"], entry["phase"], entry["operation"])] = \
+                LatencyHistogram.fromDict(entry["histogram"])
+    return recorder
+
+
+def measure(recorder, player, operation, phase=None):
+    """
+    :param recorder: the LatencyRecorder (None if the latencies are not recorded)
+    :param player: the player that performs the operation
+    :param operation: name of the operation
+    :param phase: phase of the game (None for the phase of the current position)
+    :return: a context manager that records the time of the code inside it (that does nothing without recorder)
+    """
+    if recorder is None:
+        return NO_MEASURE
+    return recorder.measure(type(player).__name__, operation, phase)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Report of the latencies recorded in the games")
+    parser.add_argument("inputs", nargs="+", help="files saved by the games")
+    parser.add_argument("--output", default=None, help="file in which the merged histograms are saved")
+    arguments = parser.parse_args()
+
+    merged = LatencyRecorder()
+    for path in arguments.inputs:
+        merged.merge(loadRecorder(path))
+    print(merged.report())
+    if arguments.output is not None:
+        merged.dump(arguments.output)
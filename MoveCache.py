@@ -0,0 +1,155 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+"""
+
+import os
+from collections import OrderedDict
+
+from Storage import writeAtomically, readPickled
+
+
+def policyFingerprint(path):
+    """
+    Method that identifies the version of a policy file
+    :param path: is the path of the policy file
+    :return: a tuple (size, modification time), None if the file doesn't exist
+    """
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    return info.st_size, info.st_mtime_ns
+
+
+class MoveCache:
+    def __init__(self, maxSize=100000, path=None):
+        """
+        Initialize the cache board hash -> column chosen, used when the artificial player never explores
+        The least recently used positions are removed when the cache is full, and when the values of the states change
+        the positions whose action would be different are removed
+        :param maxSize: maximum number of positions in the cache
+        :param path: path of the file in which the cache is saved between two executions (None to not save it)
+        """
+        self.maxSize = maxSize
+        self.path = path
+        self.entries = OrderedDict()
+        # Board hash -> (hashes of the boards after each action, index of the action chosen) for the actions chosen
+        # with the values (empty for the actions that don't depend on them: win, block, tablebase)
+        self.children = {}
+        # Hash of a board after an action -> board hashes of the positions whose action depends on it
+        self.dependents = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, boardHash):
+        """
+        Take the column chosen in a position
+        :param boardHash: is the hash of the board
+        :return: the column chosen, None if the position is not in the cache
+        """
+        action = self.entries.get(boardHash)
+        if action is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Now it's the most recently used
+        self.entries.move_to_end(boardHash)
+        return action
+
+    def put(self, boardHash, action, childHashes=(), chosen=None):
+        """
+        Save the column chosen in a position
+        :param boardHash: is the hash of the board
+        :param action: is the column chosen
+        :param childHashes: hashes of the boards after each possible action (as saved in the policy), empty if the
+            action doesn't depend on the values
+        :param chosen: index of the action chosen in childHashes
+        :return: nothing
+        """
+        if boardHash in self.entries:
+            self.remove(boardHash)
+        self.entries[boardHash] = action
+        self.children[boardHash] = (tuple(childHashes), chosen)
+        for child in self.children[boardHash][0]:
+            self.dependents.setdefault(child, set()).add(boardHash)
+        if len(self.entries) > self.maxSize:
+            # Remove the least recently used position
+            self.remove(next(iter(self.entries)))
+
+    def remove(self, boardHash):
+        """
+        Remove a position
+        :param boardHash: is the hash of the board
+        :return: nothing
+        """
+        del self.entries[boardHash]
+        for child in self.children.pop(boardHash)[0]:
+            dependents = self.dependents.get(child)
+            if dependents is not None:
+                dependents.discard(boardHash)
+                if not dependents:
+                    del self.dependents[child]
+
+    def invalidate(self, states, bestChild):
+        """
+        Remove the positions whose action was chosen with some of the states and is no more the best one:
+        called when the values of the states change
+        :param states: hashes of the states updated
+        :param bestChild: function (hashes of the children) -> index of the child chosen with the current values
+        :return: nothing
+        """
+        for state in states:
+            for boardHash in list(self.dependents.get(state, ())):
+                childHashes, chosen = self.children[boardHash]
+                if bestChild(childHashes) != chosen:
+                    self.remove(boardHash)
+
+    def clear(self):
+        """
+        Remove all the positions: called when the whole policy changes
+        :return: nothing
+        """
+        self.entries.clear()
+        self.children.clear()
+        self.dependents.clear()
+
+    def statistics(self):
+        """
+        :return: a string with size, hits and misses of the cache
+        """
+        total = self.hits + self.misses
+        hitRate = 0 if total == 0 else 100 * self.hits / total
+        return "Move cache: {} positions, {} hits, {} misses ({:.1f}% hit rate)".format(
+            len(self.entries), self.hits, self.misses, hitRate)
+
+    def save(self, fingerprint):
+        """
+        Save the cache in its file
+        :param fingerprint: is the fingerprint of the policy the moves were chosen with (see policyFingerprint)
+        :return: nothing
+        """
+        if self.path is not None:
+            writeAtomically(self.path, {"fingerprint": fingerprint,
+                                        "entries": {boardHash: (action,) + self.children[boardHash]
+                                                    for boardHash, action in self.entries.items()}})
+
+    def load(self, fingerprint):
+        """
+        Load the cache from its file if it was saved with the same policy
+        :param fingerprint: is the fingerprint of the policy currently loaded (see policyFingerprint)
+        :return: nothing
+        """
+        if self.path is None:
+            return
+        saved = readPickled(self.path)
+        if saved is not None and fingerprint is not None and saved["fingerprint"] == fingerprint:
+            self.clear()
+            for boardHash, entry in saved["entries"].items():
+                # The caches saved without the states of each action can't be updated: they are not used
+                if isinstance(entry, tuple) and len(entry) == 3:
+                    self.put(boardHash, *entry)
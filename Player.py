@@ -7,22 +7,31 @@ Example of reinforcement learning applied to a game:
     -> the training can be between the 2 artificial player and also during the game with a human player
 """
 
-import pickle
+import time
+import threading
 from pathlib import Path
 import numpy as np
 
 from Enumerations import CellState
+from Storage import writeAtomically, readPickled, writePolicyFile, readPolicyFile
+from Board import DEFAULT_CONFIG
+from Zobrist import boardHash
+from MoveCache import MoveCache, policyFingerprint
+from ShardedPolicy import ShardedPolicy, shardsFolder
+from Latency import measure
 
 
 class Player:
-    def __init__(self, name, symbol):
+    def __init__(self, name, symbol, config=None):
         """
         Initialize name and symbol of the player
         :param name: name of the player
         :param symbol: symbol of the player: 'X' if first player, 'O' otherwise
+        :param config: the BoardConfig of the game (the classic board if None)
         """
         self.name = name
         self.symbol = symbol
+        self.config = DEFAULT_CONFIG if config is None else config
 
     def setName(self , name):
         """
@@ -57,74 +66,176 @@ class Player:
 
 class ArtificialPlayer(Player):
 
-    def __init__(self, name, symbol, exp_rate=0.4):
+    def __init__(self, name, symbol, exp_rate=0.4, config=None):
         """
         Initialize the artificial player
         :param name: name of the player
         :param symbol: symbol of the player
         :param exp_rate: constant indicating the probability of performing a random action
+        :param config: the BoardConfig of the game (the classic board if None)
         """
-        super().__init__(name, symbol)
+        super().__init__(name, symbol, config)
 
-        # To save all positions taken
-        self.states = []
+        # To save all positions taken: a buffer allocated once for the whole training, the first moves are
+        # the states of the current game
+        self.states = [None] * (self.config.cells // 2 + 1)
+        self.moves = 0
         # State -> value
         self.states_value = {}
+        # State -> number of updates of the value
+        self.states_visits = {}
         # Epsilon-greedy method to balance between exploration and exploitation
         self.exp_rate = exp_rate
         # learning rate
         self.lr = 0.8
         self.gamma = 0.9
 
-    def getHash(self, board, board_rows=6, board_cols=7):
+        # Endgame tablebase probed in the positions with few empty cells (None if not available)
+        self.tablebase = None
+
+        # Statistics of the last back propagation: (mean absolute change of the values, number of states
+        # updated, number of new states), None before the first one
+        self.lastUpdate = None
+
+        # Cache of the actions chosen when the player doesn't explore (None if disabled)
+        self.moveCache = None
+        # Version of the policy file loaded
+        self.policyFingerprint = None
+        # Thread that is loading the policy (see loadPolicyInBackground), joined by only one thread at a time
+        self.policyLoader = None
+        self.policyLoaderLock = threading.Lock()
+        # New version of the policy read by the watcher, used from the next action (see watchPolicy)
+        self.pendingPolicy = None
+
+        # If True the policy is saved in one shard for each ply (see useShardedPolicy)
+        self.shardedPolicy = False
+        self.maxLoadedStates = None
+        # The shards of the policy (None until loaded or saved)
+        self.policyShards = None
+        # If True the policy compacted for the games with a human player is used (see PolicyCompact)
+        self.servingPolicy = False
+
+        # LatencyRecorder of the operations of the player (None if the latencies are not recorded)
+        self.latency = None
+
+    def getHash(self, board):
         """
         Get the hash of a board
         :param board: the board of whom calculate the hash
-        :param board_rows: number of rows in the board
-        :param board_cols: number of columns in the board
         :return: the hah of the board
         """
-        boardHash = str(board.reshape(board_rows * board_cols))
-        return boardHash
+        return boardHash(board.reshape(self.config.rows, self.config.cols))
 
-    def chooseAction(self, positions, board):
+    def useShardedPolicy(self, maxStates=None):
+        """
+        Method that makes the player save the policy in one shard for each ply: the shards are read only when
+        a position with their ply is reached (call it before loading the policy)
+        :param maxStates: number of states in memory over which the shards not changed since the last save are
+            unloaded (None to keep every shard read)
+        :return: nothing
+        """
+        self.shardedPolicy = True
+        self.maxLoadedStates = maxStates
+
+    def policyExists(self):
+        """
+        :return: True if the policy of the player was saved (in a single file or in shards)
+        """
+        if self.shardedPolicy and shardsFolder(self.policyFile()).is_dir():
+            return True
+        return Path(self.policyFile()).is_file()
+
+    def enableMoveCache(self, maxSize=100000, path=None):
+        """
+        Method that enables the cache of the actions chosen, used only if the player never explores (exp_rate=0)
+        :param maxSize: maximum number of positions in the cache
+        :param path: path of the file in which the cache is saved with the policy (None to not save it)
+        :return: nothing
+        """
+        self.waitPolicy()
+        self.moveCache = MoveCache(maxSize, path)
+        # Reuse the moves saved with the same policy
+        self.moveCache.load(self.policyFingerprint)
+
+    def policyChanged(self, states=None):
+        """
+        Method called every time the policy is updated: the actions in the cache may be no more the best ones
+        :param states: the states whose value changed (None if the whole policy changed)
+        :return: nothing
+        """
+        if self.moveCache is not None:
+            if states is None:
+                self.moveCache.clear()
+            else:
+                # Only the actions that changed
+                self.moveCache.invalidate(states, self.bestChild)
+
+    def chooseAction(self, positions, board, childHashes=None, cells=None, heights=None, boardHash=None):
         """
         Method that chooses the action of the artificial player:
             - random action (40% of the actions during the training game , never otherwise)
             - action related to his experience
+        If the player never explores, the action depends only on the board: it's taken from the cache if enabled
+        (only when the hashes of the children are given, they are the states the cached action depends on)
         :param positions: is a list containing all the positions in which is possible perform an action
         :param board: is the board of the game
+        :param childHashes: list with the hash of the board after the action in each position (optional,
+            computed from the board if missing)
+        :param cells: the flattened board kept by the game (optional, computed from the board if missing)
+        :param heights: the first free row of each column kept by the game (optional, as cells)
+        :param boardHash: the hash of the board kept by the game (optional, computed from the board if missing)
         :return: a tuple containing the coordinates of the board on which do the action (add the symbol of the player)
         """
-        # Check if with one action the player can win -> do it
-
-        for y in positions:
-            # Make a copy of the board
-            next_board = board.copy()
-            # Save the pair (x,y)
-            position = (self.get_available_x(next_board, y), y)
-            # Add the symbol in a possible position
-            next_board[position] = self.symbol
-            if self.action_check(next_board, self.symbol):
-                # print("Return a position to win")
-                return y
-
-        if self.symbol == CellState.X_Value:
-            enemy_symbol = CellState.O_Value
+        # The latencies are measured only if recorded: the training never pays for them
+        if self.latency is None:
+            self.waitPolicy()
         else:
-            enemy_symbol = CellState.X_Value
+            with measure(self.latency, self, "waitPolicy"):
+                self.waitPolicy()
+        self.swapPolicy()
+        if self.moveCache is None or self.exp_rate != 0 or childHashes is None:
+            return self.decideAction(positions, board, childHashes, cells, heights)
+
+        currentHash = boardHash if boardHash is not None else self.getHash(board)
+        action = self.moveCache.get(currentHash)
+        if action is None:
+            action = self.forcedAction(positions, board, cells, heights)
+            if action is not None:
+                self.moveCache.put(currentHash, action)
+            else:
+                # The player never explores: the action is the greedy one
+                action = self.greedyAction(positions, board, childHashes)
+                self.moveCache.put(currentHash, action, childHashes[:len(positions)], positions.index(action))
+        return action
 
-        # Check if with one action the enemy can win -> block him
-        for y in positions:
-            # Make a copy of the board
-            next_board = board.copy()
-            # Save the pair (x,y)
-            position = (self.get_available_x(next_board, y), y)
-            # Add the symbol in a possible position
-            next_board[position] = enemy_symbol
-            if self.action_check(next_board, enemy_symbol):
-                # print("Return a position to not lose")
-                return y
+    def bestChild(self, childHashes):
+        """
+        Method that chooses the state with the highest value in the table, as greedyAction
+        :param childHashes: list with the hash of the board after each action
+        :return: the index of the state chosen
+        """
+        valueMax = -999
+        chosen = None
+        for i, state in enumerate(childHashes):
+            value = self.states_value.get(state, 0)
+            if value >= valueMax:
+                valueMax = value
+                chosen = i
+        return chosen
+
+    def decideAction(self, positions, board, childHashes=None, cells=None, heights=None):
+        """
+        Method that computes the action of the artificial player (see chooseAction)
+        :param positions: is a list containing all the positions in which is possible perform an action
+        :param board: is the board of the game
+        :param childHashes: list with the hash of the board after the action in each position (optional)
+        :param cells: the flattened board (optional)
+        :param heights: the first free row of each column (optional)
+        :return: the column chosen
+        """
+        action = self.forcedAction(positions, board, cells, heights)
+        if action is not None:
+            return action
 
         # print("Return a classical position")
         # Perform the traditional action according to the exploration/exploitation technique
@@ -132,77 +243,98 @@ class ArtificialPlayer(Player):
             # Take a random action
             idx = np.random.choice(len(positions))
             action = positions[idx]
+        elif self.latency is None:
+            action = self.greedyAction(positions, board, childHashes)
         else:
-            valueMax = -999
-            action = None
-            for y in positions:
-                # Make a copy of the board
-                next_board = board.copy()
-                # Save the pair (x,y)
-                position = (self.get_available_x(next_board, y), y)
-                # Add the symbol in a possible position
-                next_board[position] = self.symbol
-                # Take the next board hash
-                next_boardHash = self.getHash(next_board)
-                value = 0 if self.states_value.get(next_boardHash) is None \
-                    else self.states_value.get(next_boardHash)
-                # print("Value: " , value)
-                if value >= valueMax:
-                    valueMax = value
-                    action = y
+            with measure(self.latency, self, "valueLookup"):
+                action = self.greedyAction(positions, board, childHashes)
         # print("{} takes action {}".format(self.name, action))
         return action
 
-    def winner_check(self, board, x, y, x_dir, y_dir):
+    def forcedAction(self, positions, board, cells=None, heights=None):
         """
-        Method that check if there are 4 symbols in a line
-        :param board: the game board
-        :param x: is the x coordinates of the point to check
-        :param y: is the y coordinates of the point to check
-        :param x_dir: is the x direction of the line to check: 0 vertical, 1 go up
-        :param y_dir: is the y direction of the line to check: 0 horizontal, 1 go up
-        :return: +4/-4 if a user won, something else otherwise
+        Method that checks the actions that don't depend on the values: win, tablebase and block
+        :param positions: is a list containing all the positions in which is possible perform an action
+        :param board: is the board of the game
+        :param cells: the flattened board (optional)
+        :param heights: the first free row of each column (optional)
+        :return: the column chosen, None if the action depends on the values
         """
+        # Only the lines through the cell of an action can be completed by the action
+        if cells is None:
+            cells = board.reshape(-1).tolist()
+            heights = np.count_nonzero(board != CellState.empty_Value, axis=0).tolist()
 
-        # If the check will exceed the board limits
-        if x + 3 * x_dir >= board.shape[0] or y + 3 * y_dir >= board.shape[1] or\
-                x + 3 * x_dir < 0 or y + 3 * y_dir < 0:
-            return 0
-
-        result = 0
-
-        for i in range(4):
-            # Add the value of the next cell in the line to check
-            result += board[x + i * x_dir, y + i * y_dir]
+        if self.symbol == CellState.X_Value:
+            enemy_symbol = CellState.O_Value
+        else:
+            enemy_symbol = CellState.X_Value
 
-        return result
+        if self.latency is None:
+            # Win, perfect action in the endgame (if the position is in the tablebase), block
+            action = self.completingAction(positions, cells, heights, self.symbol)
+            if action is None and self.tablebase is not None:
+                action = self.tablebase.bestAction(positions, board, self.symbol)
+            if action is None:
+                action = self.completingAction(positions, cells, heights, enemy_symbol)
+            return action
+
+        # The same checks, measuring each one
+        with measure(self.latency, self, "winScan"):
+            action = self.completingAction(positions, cells, heights, self.symbol)
+        if action is None and self.tablebase is not None:
+            with measure(self.latency, self, "tablebase"):
+                action = self.tablebase.bestAction(positions, board, self.symbol)
+        if action is None:
+            with measure(self.latency, self, "blockScan"):
+                action = self.completingAction(positions, cells, heights, enemy_symbol)
+        return action
 
-    def action_check(self, board, symbol):
+    def completingAction(self, positions, cells, heights, symbol):
         """
-        Check the board and search for end game conditions
-        :param board: the board game
-        :param symbol: symbol to check for
-        :return: True if the player with symbol win, False otherwise
+        Method that checks if with one action a symbol completes a line (the player wins or the enemy can win)
+        :param positions: is a list containing all the positions in which is possible perform an action
+        :param cells: the flattened board
+        :param heights: the first free row of each column
+        :param symbol: the symbol of the player that does the action
+        :return: the first column that completes a line, None if there isn't one
         """
+        cols = self.config.cols
+        for y in positions:
+            if self.config.completesLine(cells, heights[y] * cols + y, symbol):
+                return y
+        return None
 
-        if symbol == CellState.X_Value:
-            value = 4
-        else:
-            value = -4
-
-        # Check if someone won
-        for x in range(board.shape[0]):
-            for y in range(board.shape[1]):
-                if board[x, y] != CellState.empty_Value:
-
-                    if self.winner_check(board, x, y, 1, 0) == value or \
-                            self.winner_check(board, x, y, 0, 1) == value or \
-                            self.winner_check(board, x, y, 1, 1) == value or \
-                            self.winner_check(board, x, y, -1, 1) == value:
-                        return True
-
-        # If no winner
-        return False
+    def greedyAction(self, positions, board, childHashes=None):
+        """
+        Method that chooses the action with the highest value according to the experience of the player
+        :param positions: is a list containing all the positions in which is possible perform an action
+        :param board: is the board of the game
+        :param childHashes: list with the hash of the board after the action in each position (optional)
+        :return: the column chosen
+        """
+        valueMax = -999
+        action = None
+        for i, y in enumerate(positions):
+            if childHashes is not None:
+                # The hash was derived by the game from the hash of the current board
+                next_boardHash = childHashes[i]
+            else:
+                # Make a copy of the board
+                next_board = board.copy()
+                # Save the pair (x,y)
+                position = (self.get_available_x(next_board, y), y)
+                # Add the symbol in a possible position
+                next_board[position] = self.symbol
+                # Take the next board hash
+                next_boardHash = self.getHash(next_board)
+            value = 0 if self.states_value.get(next_boardHash) is None \
+                else self.states_value.get(next_boardHash)
+            # print("Value: " , value)
+            if value >= valueMax:
+                valueMax = value
+                action = y
+        return action
 
     def addState(self, state):
         """
@@ -210,7 +342,8 @@ class ArtificialPlayer(Player):
         :param state: is the new state after the action
         :return: nothing
         """
-        self.states.append(state)
+        self.states[self.moves] = state
+        self.moves += 1
 
     def feedReward(self, reward):
         """
@@ -218,14 +351,20 @@ class ArtificialPlayer(Player):
         :param reward: is the reward sent after the end of the game accordingly to the result
         :return: nothing
         """
+        self.waitPolicy()
         # print("Updating value")
         next_state = None
+        change = 0
+        newStates = 0
         # print("In order states are: ", self.states)
         # print("Reversed states are: ", [x for x in reversed(self.states)])
-        for state in reversed(self.states):
+        for move in range(self.moves - 1, -1, -1):
+            state = self.states[move]
+            previous = self.states_value.get(state)
             # If it's a new state never visited before
-            if self.states_value.get(state) is None:
-                self.states_value[state] = 0
+            if previous is None:
+                self.states_value[state] = previous = 0
+                newStates += 1
             if next_state is not None:
                 # Update the existing value using reinforcement learning formula
                 self.states_value[state] = (1 - self.lr) * self.states_value[state] \
@@ -233,46 +372,370 @@ class ArtificialPlayer(Player):
             else:
                 # Update the existing value using reinforcement learning formula
                 self.states_value[state] = (1 - self.lr) * self.states_value[state] + self.lr * reward
+            self.states_visits[state] = self.states_visits.get(state, 0) + 1
+            change += abs(self.states_value[state] - previous)
             # Save the current state to use it in the next iteration
             next_state = state
+        self.lastUpdate = (change / self.moves if self.moves else 0, self.moves, newStates)
+        self.policyChanged(self.states[:self.moves])
 
     def reset(self):
         """
-        Reset the states of the current game for the next game
+        Reset the states of the current game for the next game (the buffer is reused)
         :return: nothing
         """
-        self.states = []
+        self.moves = 0
 
     def savePolicy(self):
         """
         Method that saves the new updated policy of the player
         :return: nothing
         """
+        self.waitPolicy()
         print("Saving configuration...")
-        file = open('Files/policy_' + str(self.name), 'wb')
-        pickle.dump(self.states_value, file)
-        file.close()
+        if self.shardedPolicy:
+            if self.policyShards is None or self.states_value is not self.policyShards.values:
+                # The tables were read from a single file or restored from a checkpoint
+                self.policyShards = ShardedPolicy(shardsFolder(self.policyFile()), self.config.header,
+                                                  self.maxLoadedStates)
+                self.policyShards.replace(self.states_value, self.states_visits)
+                self.states_value, self.states_visits = self.policyShards.values, self.policyShards.visits
+            # Only the shards changed are written
+            self.policyFingerprint = policyFingerprint(self.policyShards.save())
+        else:
+            writePolicyFile(self.policyFile(), self.states_value, self.states_visits, self.config.header)
+            self.policyFingerprint = policyFingerprint(self.policyFile())
+        # The moves in the cache were chosen with the policy just saved
+        if self.moveCache is not None:
+            self.moveCache.save(self.policyFingerprint)
         print("Configuration saved!")
 
-    def loadPolicy(self, f):
+    def policyReplaced(self):
+        """
+        Method that checks if the saved policy changed after the player loaded or saved it (e.g. a new version saved
+        by a training while a game with a human player was running)
+        :return: True if the policy on disk is a different version (saving would overwrite it)
+        """
+        self.waitPolicy()
+        return self.policyVersion(self.policyFile()) != self.policyFingerprint
+
+    def policyFile(self):
+        """
+        :return: the path of the file in which the policy of the player is saved
+        """
+        suffix = ('_serving' if self.servingPolicy else '') + self.config.tag
+        return 'Files/policy_' + str(self.name) + suffix
+
+    def policySnapshot(self):
+        """
+        Method that takes a copy of the policy that can be saved while the player keeps learning
+        :return: the copy of the policy: pair (values, number of updates)
+        """
+        self.waitPolicy()
+        return dict(self.states_value), dict(self.states_visits)
+
+    def restorePolicySnapshot(self, snapshot):
+        """
+        Method that restores a policy taken with policySnapshot
+        :param snapshot: the copy of the policy
+        :return: nothing
+        """
+        self.states_value, self.states_visits = snapshot
+        self.policyChanged()
+
+    def policyVersion(self, f):
+        """
+        :param f: is the path of the file
+        :return: the fingerprint of the saved policy (of the manifest for the sharded policies), None if not saved
+        """
+        if self.shardedPolicy and shardsFolder(f).is_dir():
+            return policyFingerprint(shardsFolder(f) / "manifest")
+        return policyFingerprint(f)
+
+    def readPolicySnapshot(self, f):
+        """
+        Method that reads a saved policy without using it
+        :param f: is the path of the file
+        :return: a pair (snapshot of the policy as taken by policySnapshot, ShardedPolicy or None)
+        """
+        if self.shardedPolicy and shardsFolder(f).is_dir():
+            # Only the manifest is read: the shards are read when needed
+            shards = ShardedPolicy(shardsFolder(f), self.config.header, self.maxLoadedStates)
+            return (shards.values, shards.visits), shards
+        header, states_value, states_visits = readPolicyFile(f)
+        if header != self.config.header:
+            raise ValueError("The policy " + str(f) + " was trained on a different board")
+        return (states_value, states_visits), None
+
+    def installPolicy(self, snapshot, shards, version):
+        """
+        Method that starts using a policy read by readPolicySnapshot
+        :param snapshot: the policy
+        :param shards: the ShardedPolicy of the policy (None if read from a single file)
+        :param version: fingerprint of the policy read
+        :return: nothing
+        """
+        self.policyShards = shards
+        self.policyFingerprint = version
+        self.restorePolicySnapshot(snapshot)
+
+    def loadPolicy(self, f, verbose=True):
         """
         Method that loads the policy of the player before starting the game
         :param f: is the path of the file
+        :param verbose: if False the messages are not printed (only the errors)
         :return: nothing
         """
-        print("Loading policy...")
-        if Path(f).is_file():
-            file = open(f, 'rb')
-            self.states_value = pickle.load(file)
-            file.close()
-            print("Policy loaded")
+        if verbose:
+            print("Loading policy...")
+        version = self.policyVersion(f)
+        if version is not None:
+            with measure(self.latency, self, "loadPolicy", "startup"):
+                self.installPolicy(*self.readPolicySnapshot(f), version)
+            if verbose:
+                print("Policy loaded")
         else:
             print("Error in uploading the policy")
 
+    def loadPolicyInBackground(self, f):
+        """
+        Method that starts loading the policy in another thread: the player waits for it only when it's needed
+        :param f: is the path of the file
+        :return: nothing
+        """
+        self.policyLoader = threading.Thread(target=self.loadPolicy, args=(f, False), daemon=True)
+        self.policyLoader.start()
+
+    def waitPolicy(self):
+        """
+        Method that waits for the policy loaded in background (if any)
+        :return: nothing
+        """
+        # The game and the watcher can wait at the same time: the second one waits for the lock
+        with self.policyLoaderLock:
+            if self.policyLoader is not None:
+                self.policyLoader.join()
+                self.policyLoader = None
+
+    def watchPolicy(self, interval=5.0):
+        """
+        Method that starts a thread that checks the policy file every interval seconds: a new version (e.g. saved
+        by a training) is read in background and used from the next action, the games are never paused
+        The updates learned after the last save are replaced by the new version
+        :param interval: seconds between two checks
+        :return: nothing
+        """
+        watcher = threading.Thread(target=self.watchPolicyFile, args=(self.policyFile(), interval), daemon=True)
+        watcher.start()
+
+    def watchPolicyFile(self, f, interval):
+        """
+        Method executed by the thread started by watchPolicy
+        :param f: is the path of the file
+        :param interval: seconds between two checks
+        :return: nothing (it never ends)
+        """
+        self.waitPolicy()
+        while True:
+            time.sleep(interval)
+            version = self.policyVersion(f)
+            # Never more than one version waiting: at most two policies in memory
+            if version is None or version == self.policyFingerprint or self.pendingPolicy is not None:
+                continue
+            try:
+                snapshot, shards = self.readPolicySnapshot(f)
+            except (OSError, EOFError, ValueError) as error:
+                print("Error in reloading the policy: " + str(error))
+                continue
+            self.pendingPolicy = (snapshot, shards, version)
+
+    def swapPolicy(self):
+        """
+        Method that starts using the new version of the policy read by the watcher (if any),
+        called between two actions
+        :return: nothing
+        """
+        pending = self.pendingPolicy
+        if pending is not None:
+            self.pendingPolicy = None
+            # The old tables are released here
+            self.installPolicy(*pending)
+
+
+class NTupleArtificialPlayer(ArtificialPlayer):
+
+    def __init__(self, name, symbol, exp_rate=0.4, tuples=None, config=None):
+        """
+        Initialize the artificial player whose value function is an n-tuple network:
+            each tuple is a fixed set of cells, the content of the cells is the index of a weight in the tuple's table
+            and the value of a board is the sum of the weights selected by all the tuples
+        :param name: name of the player
+        :param symbol: symbol of the player
+        :param exp_rate: constant indicating the probability of performing a random action
+        :param tuples: list of tuples of cells (indexes in the flattened board) all with the same length,
+            by default all the lines of K cells
+        :param config: the BoardConfig of the game (the classic board if None)
+        """
+        super().__init__(name, symbol, exp_rate, config=config)
+
+        if tuples is None:
+            tuples = self.config.lines
+        self.tuples = np.array(tuples, dtype=np.intp)
+        # Each cell has 3 states: the tuple's content is a number in base 3
+        self.powers = 3 ** np.arange(self.tuples.shape[1])
+        # One row of weights for each tuple
+        self.weights = np.zeros((self.tuples.shape[0], 3 ** self.tuples.shape[1]))
+        self.tupleRange = np.arange(self.tuples.shape[0])
+
+        # Weight indexes of the afterstate of the last action chosen
+        self.lastAfterstate = None
+
+    def tupleIndexes(self, boards):
+        """
+        Method that computes the index of the weight selected by each tuple
+        :param boards: matrix with one flattened board for each row
+        :return: matrix (boards x tuples) of weight indexes
+        """
+        # From -1, 0, 1 to 0, 1, 2
+        cells = boards[:, self.tuples].astype(np.intp) + 1
+        return cells @ self.powers
+
+    def evaluate(self, boards):
+        """
+        Method that computes the value of many boards at once
+        :param boards: matrix with one flattened board for each row
+        :return: array with the value of each board
+        """
+        return self.weights[self.tupleRange, self.tupleIndexes(boards)].sum(axis=1)
+
+    def afterstates(self, positions, board):
+        """
+        Method that builds the boards obtained adding the symbol of the player in each available column
+        :param positions: is a list containing all the positions in which is possible perform an action
+        :param board: is the board of the game
+        :return: matrix with one flattened afterstate for each position
+        """
+        columns = np.asarray(positions)
+        # The first free row of a column is the number of symbols in it
+        rows = np.count_nonzero(board != CellState.empty_Value, axis=0)[columns]
+        boards = np.repeat(board.reshape(1, -1), len(columns), axis=0)
+        boards[np.arange(len(columns)), rows * board.shape[1] + columns] = self.symbol
+        return boards
+
+    def chooseAction(self, positions, board, childHashes=None, cells=None, heights=None, boardHash=None):
+        """
+        Method that chooses the action of the artificial player (see ArtificialPlayer.chooseAction)
+        and remembers the afterstate for the back propagation of the reward
+        :param positions: is a list containing all the positions in which is possible perform an action
+        :param board: is the board of the game
+        :param childHashes: not used, the afterstates are evaluated by the network
+        :param cells: the flattened board (optional)
+        :param heights: the first free row of each column (optional)
+        :param boardHash: the hash of the board (optional)
+        :return: the column chosen
+        """
+        action = super().chooseAction(positions, board, childHashes, cells, heights, boardHash)
+        self.lastAfterstate = self.tupleIndexes(self.afterstates([action], board))[0]
+        return action
+
+    def greedyAction(self, positions, board, childHashes=None):
+        """
+        Method that chooses the action with the highest value evaluating all the afterstates in one pass
+        :param positions: is a list containing all the positions in which is possible perform an action
+        :param board: is the board of the game
+        :param childHashes: not used
+        :return: the column chosen
+        """
+        values = self.evaluate(self.afterstates(positions, board))
+        # As in the tabular player, with the same value the last column wins
+        return positions[len(positions) - 1 - int(np.argmax(values[::-1]))]
+
+    def addState(self, state):
+        """
+        Add the afterstate of the last action chosen in the list
+        :param state: is the hash of the new state after the action (not used: the weight indexes are saved)
+        :return: nothing
+        """
+        self.states[self.moves] = self.lastAfterstate
+        self.moves += 1
+
+    def feedReward(self, reward):
+        """
+        Back propagation of the reward received during the current game
+        Same update of the tabular player: the error is split among the weights selected by the tuples
+        :param reward: is the reward sent after the end of the game accordingly to the result
+        :return: nothing
+        """
+        self.waitPolicy()
+        next_value = None
+        change = 0
+        for move in range(self.moves - 1, -1, -1):
+            indexes = self.states[move]
+            value = self.weights[self.tupleRange, indexes].sum()
+            if next_value is not None:
+                target = reward + self.gamma * next_value
+            else:
+                target = reward
+            error = self.lr * (target - value)
+            self.weights[self.tupleRange, indexes] += error / len(self.tupleRange)
+            change += abs(error)
+            # Value of the state after the update
+            next_value = value + error
+        # The network has no new states
+        self.lastUpdate = (change / self.moves if self.moves else 0, self.moves, 0)
+        self.policyChanged()
+
+    def policyFile(self):
+        """
+        :return: the path of the file in which the weights of the player are saved
+        """
+        return 'Files/ntuple_' + str(self.name) + self.config.tag
+
+    def savePolicy(self):
+        """
+        Method that saves the tuples and the weights of the player
+        :return: nothing
+        """
+        self.waitPolicy()
+        print("Saving configuration...")
+        writeAtomically(self.policyFile(), {"tuples": self.tuples, "weights": self.weights})
+        self.policyFingerprint = policyFingerprint(self.policyFile())
+        if self.moveCache is not None:
+            self.moveCache.save(self.policyFingerprint)
+        print("Configuration saved!")
+
+    def readPolicySnapshot(self, f):
+        """
+        Method that reads the saved tuples and weights without using them
+        :param f: is the path of the file
+        :return: a pair (snapshot of the network as taken by policySnapshot, None)
+        """
+        return readPickled(f), None
+
+    def policySnapshot(self):
+        """
+        Method that takes a copy of the network that can be saved while the player keeps learning
+        :return: the copy of the network
+        """
+        self.waitPolicy()
+        return {"tuples": self.tuples.copy(), "weights": self.weights.copy()}
+
+    def restorePolicySnapshot(self, snapshot):
+        """
+        Method that restores a network taken with policySnapshot
+        :param snapshot: the copy of the network
+        :return: nothing
+        """
+        self.tuples = snapshot["tuples"]
+        self.weights = snapshot["weights"]
+        self.powers = 3 ** np.arange(self.tuples.shape[1])
+        self.tupleRange = np.arange(self.tuples.shape[0])
+        self.policyChanged()
+
 
 class HumanPlayer(Player):
-    def __init__(self, name, symbol):
-        super().__init__(name, symbol)
+    def __init__(self, name, symbol, config=None):
+        super().__init__(name, symbol, config)
 
     def chooseAction(self, positions):
         """
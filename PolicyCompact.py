@@ -0,0 +1,258 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+
+Compaction of a policy for the games with a human player: the artificial player never explores, so only the
+values that decide its actions in the positions it can reach are needed.
+Every position reachable from the empty board is visited, with the action of the artificial player and every
+action of the opponent, up to the largest number of symbols for which the positions are at most max-positions
+(on the classic board the reachable positions are too many to visit them all). In each position where the action
+depends on the values (not a win, a block or an action of the tablebase) the kept states are:
+    -> the state after the action chosen
+    -> if its value is not positive, the states of the following columns (otherwise the missing states, worth 0,
+       would win the ties)
+    -> if its value is negative, also the states of the previous columns
+The states with more symbols than the positions visited are all kept, so the actions in the deeper positions
+don't change. Then the walk is repeated with the compacted policy, checking that every action is the same.
+The compacted policy is valid with the tablebase used by the walk (the one of the board, if generated) and it's
+used in the games with --serving-policy (the games keep learning on it).
+
+Usage:
+    py PolicyCompact.py X|O [--sharded-policy] [--rows R --cols C --k K] [--max-positions N]
+"""
+
+import argparse
+
+import numpy as np
+
+from Enumerations import CellState
+from Player import ArtificialPlayer
+from Storage import writePolicyFile
+from Tablebase import loadTablebase
+from Zobrist import childHash, ply
+from Board import boardConfig, BOARD_ROWS, BOARD_COLS, LINE_LENGTH
+
+# Maximum number of positions visited by default (the number of reachable positions grows quickly with the board)
+MAX_POSITIONS = 5000000
+
+
+class PolicyWalker:
+    def __init__(self, player, maxPly, maxPositions=MAX_POSITIONS):
+        """
+        Initialize the walk of the positions reachable by an artificial player
+        :param player: the artificial player (with exp_rate=0)
+        :param maxPly: the positions with less symbols are visited
+        :param maxPositions: maximum number of positions visited
+        """
+        self.player = player
+        self.config = player.config
+        self.zobrist = self.config.zobrist
+        self.maxPly = maxPly
+        self.maxPositions = maxPositions
+
+        self.board = np.zeros((self.config.rows, self.config.cols))
+        self.cells = [CellState.empty_Value] * self.config.cells
+        self.heights = [0] * self.config.cols
+        self.hash = 0
+
+    def move(self, y, symbol, cell):
+        """
+        Method that adds a symbol in a cell (see undo)
+        :param y: column of the cell
+        :param symbol: the symbol
+        :param cell: the cell
+        :return: the hash before the action
+        """
+        previous = self.hash
+        self.cells[cell] = int(symbol)
+        self.board[cell // self.config.cols, y] = symbol
+        self.heights[y] += 1
+        self.hash = childHash(self.hash, self.zobrist, cell, symbol)
+        return previous
+
+    def undo(self, y, cell, previous):
+        """
+        Method that removes the symbol added by move
+        :param y: column of the cell
+        :param cell: the cell
+        :param previous: the hash returned by move
+        :return: nothing
+        """
+        self.cells[cell] = CellState.empty_Value
+        self.board[cell // self.config.cols, y] = CellState.empty_Value
+        self.heights[y] -= 1
+        self.hash = previous
+
+    def walk(self, decide):
+        """
+        Method that visits every position reachable from the empty board with less than maxPly symbols
+        (each one once)
+        :param decide: function (positions, child hashes) -> column chosen by the artificial player
+        :return: dictionary hash of the position -> column chosen (None in the positions of the opponent)
+        :raise ValueError: if the positions are more than maxPositions
+        """
+        decisions = {}
+        self.visit(decide, decisions, CellState.X_Value, 0)
+        return decisions
+
+    def visit(self, decide, decisions, symbol, symbols):
+        """
+        Method that visits a position and the positions reachable from it
+        :param decide: see walk
+        :param decisions: the positions already visited
+        :param symbol: symbol of the player to move
+        :param symbols: number of symbols on the board
+        :return: nothing
+        """
+        if symbols >= self.maxPly or self.hash in decisions:
+            return
+        if len(decisions) >= self.maxPositions:
+            raise ValueError("More than " + str(self.maxPositions) + " positions are reachable")
+        positions = [y for y in range(self.config.cols) if self.heights[y] < self.config.rows]
+
+        if symbol == self.player.symbol:
+            childHashes = [childHash(self.hash, self.zobrist, self.heights[y] * self.config.cols + y, symbol)
+                           for y in positions]
+            action = decide(positions, childHashes)
+            decisions[self.hash] = action
+            actions = [action]
+        else:
+            decisions[self.hash] = None
+            actions = positions
+
+        for y in actions:
+            cell = self.heights[y] * self.config.cols + y
+            # The game ends with a line or with the board full
+            if self.config.completesLine(self.cells, cell, symbol) or len(positions) == 1 and \
+                    self.heights[y] == self.config.rows - 1:
+                continue
+            previous = self.move(y, symbol, cell)
+            self.visit(decide, decisions, -symbol, symbols + 1)
+            self.undo(y, cell, previous)
+
+
+def neededStates(values, chosen):
+    """
+    Method that selects the states needed to choose the same action: the action is the last one with the highest
+    value, and the missing states are worth 0
+    :param values: value of the state after each action (None if missing)
+    :param chosen: index of the action chosen
+    :return: the indexes of the states to keep
+    """
+    best = values[chosen] if values[chosen] is not None else 0
+    needed = [chosen] if values[chosen] is not None else []
+    for index, value in enumerate(values):
+        if value is None or index == chosen:
+            continue
+        # Without the state the value would be 0: it must stay lower (after the action) or not higher (before)
+        if (index > chosen and best <= 0) or (index < chosen and best < 0):
+            needed.append(index)
+    return needed
+
+
+def neededStatesToPly(player, maxPly, maxPositions=MAX_POSITIONS):
+    """
+    Method that walks the positions with less than maxPly symbols and selects the states that decide the actions
+    :param player: the artificial player with the policy loaded (and exp_rate=0)
+    :param maxPly: the positions with less symbols are visited
+    :param maxPositions: maximum number of positions visited
+    :return: a pair (set of the states needed, dictionary of the decisions returned by PolicyWalker.walk)
+    :raise ValueError: if the positions are more than maxPositions
+    """
+    walker = PolicyWalker(player, maxPly, maxPositions)
+    needed = set()
+
+    def decide(positions, childHashes):
+        action = player.forcedAction(positions, walker.board, walker.cells, walker.heights)
+        if action is not None:
+            return action
+        action = player.greedyAction(positions, walker.board, childHashes)
+        values = [player.states_value.get(state) for state in childHashes]
+        for index in neededStates(values, positions.index(action)):
+            needed.add(childHashes[index])
+        return action
+
+    return needed, walker.walk(decide)
+
+
+def compactPolicy(player, maxPositions=MAX_POSITIONS):
+    """
+    Method that keeps only the states that decide the actions of the artificial player: the positions are visited
+    with one more symbol at a time, until they are more than maxPositions
+    :param player: the artificial player with the policy loaded (its exploration rate is set to 0)
+    :param maxPositions: maximum number of positions visited
+    :return: a tuple (compacted player, number of symbols up to which the positions were visited,
+        number of positions visited, number of actions that changed)
+    """
+    player.exp_rate = 0
+    maxPly, needed, decisions = 0, set(), {}
+    for depth in range(1, player.config.cells + 1):
+        try:
+            needed, decisions = neededStatesToPly(player, depth, maxPositions)
+        except ValueError:
+            break
+        maxPly = depth
+
+    compact = ArtificialPlayer(player.name, player.symbol, 0, player.config)
+    compact.tablebase = player.tablebase
+    # The states after the actions in the positions not visited are all kept
+    compact.states_value = {state: value for state, value in player.states_value.items()
+                            if state in needed or ply(state) > maxPly}
+    compact.states_visits = {state: player.states_visits.get(state, 1) for state in compact.states_value}
+
+    # Walk again with the compacted policy: every action must be the same
+    walker = PolicyWalker(player, maxPly, maxPositions)
+    changed = 0
+
+    def check(positions, childHashes):
+        nonlocal changed
+        action = compact.decideAction(positions, walker.board, childHashes, walker.cells, walker.heights)
+        expected = decisions[walker.hash]
+        if action != expected:
+            changed += 1
+        # Follow the original policy to visit the same positions
+        return expected
+
+    walker.walk(check)
+    return compact, maxPly, len(decisions), changed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compact a policy keeping only the states that decide the actions "
+                                                 "in the games with a human player")
+    parser.add_argument("symbol", choices=["X", "O"], help="symbol of the artificial player")
+    parser.add_argument("--sharded-policy", action="store_true", help="read the policy saved in shards")
+    parser.add_argument("--rows", type=int, default=BOARD_ROWS, help="number of rows of the board")
+    parser.add_argument("--cols", type=int, default=BOARD_COLS, help="number of columns of the board")
+    parser.add_argument("--k", type=int, default=LINE_LENGTH, help="number of symbols in a line to win")
+    parser.add_argument("--max-positions", type=int, default=MAX_POSITIONS,
+                        help="maximum number of positions visited")
+    arguments = parser.parse_args()
+    try:
+        config = boardConfig(arguments.rows, arguments.cols, arguments.k)
+    except ValueError as error:
+        parser.error(str(error))
+
+    if arguments.symbol == "X":
+        player = ArtificialPlayer("U-0318", CellState.X_Value, 0, config)
+    else:
+        player = ArtificialPlayer("U-0314", CellState.O_Value, 0, config)
+    if arguments.sharded_policy:
+        player.useShardedPolicy()
+    if not player.policyExists():
+        parser.error("the policy " + player.policyFile() + " doesn't exist")
+    player.loadPolicy(player.policyFile())
+    player.tablebase = loadTablebase(config)
+
+    print("Compacting...")
+    compact, maxPly, positions, changed = compactPolicy(player, arguments.max_positions)
+    if changed > 0:
+        raise SystemExit("The compacted policy changes " + str(changed) + " actions: not saved")
+    compact.servingPolicy = True
+    writePolicyFile(compact.policyFile(), compact.states_value, compact.states_visits, config.header)
+    print("{} positions with less than {} symbols checked, {} of {} states kept: saved in {}".format(
+        positions, maxPly, len(compact.states_value), len(player.states_value), compact.policyFile()))
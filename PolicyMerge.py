@@ -0,0 +1,173 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+
+Merge of the policies trained on different machines for the same player.
+The value of a state present in more policies is the mean of its values weighted by the number of updates
+of the state in each policy (1 for the policies saved without the number of updates); the number of updates
+of the merged state is the sum.
+
+The merge is a map/reduce over shards of the states (hash of the state modulo the number of shards):
+    -> map: every policy (saved in a single file or in shards) is read streaming its items, and each item is
+       written in the file of its shard
+    -> reduce: the files of the same shard are merged
+    -> the merged shards are written one after the other in the output policy
+So at most one shard is in memory in each process (the input policies are never loaded). The merged policy is
+saved in a single file.
+
+Usage:
+    py PolicyMerge.py <output policy> <input policy> <input policy> ... [--shards S] [--processes P]
+"""
+
+import os
+import argparse
+import pickle
+import tempfile
+import shutil
+from pathlib import Path
+
+from Storage import writeDictStreams
+from ShardedPolicy import policyItems, policyHeader
+
+# Number of shards in which the states are split
+DEFAULT_SHARDS = 16
+# Number of items of a shard kept in memory before writing them in its file
+SPLIT_BUFFER = 10000
+
+
+def shardPath(folder, shard, name):
+    """
+    :param folder: folder of the intermediate files
+    :param shard: index of the shard
+    :param name: name of the file inside the shard
+    :return: the path of an intermediate file
+    """
+    return Path(folder) / ("shard_" + str(shard)) / name
+
+
+def splitPolicy(task):
+    """
+    Map step: split one policy in one file for each shard, reading the items of the policy one at a time
+    Each file contains lists of at most SPLIT_BUFFER items (0 for a value or 1 for a number of updates, state, value)
+    :param task: tuple (index of the input, path of the policy, folder of the intermediate files, number of shards)
+    :return: nothing
+    """
+    index, path, folder, shards = task
+    files = [open(shardPath(folder, shard, "input_" + str(index)), 'wb') for shard in range(shards)]
+    buffers = [[] for _ in range(shards)]
+    try:
+        for position, state, value, _ in policyItems(path):
+            shard = state % shards
+            buffers[shard].append((position, state, value))
+            if len(buffers[shard]) == SPLIT_BUFFER:
+                pickle.dump(buffers[shard], files[shard], protocol=pickle.HIGHEST_PROTOCOL)
+                buffers[shard] = []
+        for buffer, file in zip(buffers, files):
+            if buffer:
+                pickle.dump(buffer, file, protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        for file in files:
+            file.close()
+
+
+def mergeShard(task):
+    """
+    Reduce step: merge the parts of all the policies that belong to the same shard
+    :param task: tuple (folder of the intermediate files, index of the shard, number of inputs)
+    :return: number of states in the shard
+    """
+    folder, shard, inputs = task
+    # State -> (sum of the weighted values, sum of the weights)
+    totals = {}
+    for index in range(inputs):
+        path = shardPath(folder, shard, "input_" + str(index))
+        states_value, states_visits = {}, {}
+        with open(path, 'rb') as file:
+            while file.peek(1):
+                for position, state, value in pickle.load(file):
+                    (states_value if position == 0 else states_visits)[state] = value
+        os.remove(path)
+        for state, value in states_value.items():
+            # Without the number of updates every state counts as updated once
+            weight = states_visits.get(state, 1)
+            total = totals.get(state)
+            if total is None:
+                totals[state] = (value * weight, weight)
+            else:
+                totals[state] = (total[0] + value * weight, total[1] + weight)
+
+    merged = ({state: total[0] / total[1] for state, total in totals.items()},
+              {state: total[1] for state, total in totals.items()})
+    with open(shardPath(folder, shard, "merged"), 'wb') as file:
+        pickle.dump(merged, file, protocol=pickle.HIGHEST_PROTOCOL)
+    return len(totals)
+
+
+def shardItems(folder, shards, position):
+    """
+    Read the merged shards one at a time
+    :param folder: folder of the intermediate files
+    :param shards: number of shards
+    :param position: 0 for the values, 1 for the number of updates
+    :return: a generator of pairs (state, value or number of updates)
+    """
+    for shard in range(shards):
+        with open(shardPath(folder, shard, "merged"), 'rb') as file:
+            merged = pickle.load(file)
+        yield from merged[position].items()
+
+
+def mergePolicies(paths, output, shards=DEFAULT_SHARDS, processes=None):
+    """
+    Method that merges some policies of the same player in one policy
+    :param paths: list of the paths of the policies to merge (in a single file or in shards)
+    :param output: path of the merged policy
+    :param shards: number of shards in which the states are split
+    :param processes: number of worker processes (None for one for each cpu, 1 to not use other processes)
+    :return: number of states in the merged policy
+    """
+    # Only the policies of the same board can be merged
+    headers = set(policyHeader(path) for path in paths)
+    if len(headers) > 1:
+        raise ValueError("The policies were trained on different boards")
+    header = headers.pop()
+
+    folder = tempfile.mkdtemp(prefix="merge_", dir=Path(output).parent)
+    try:
+        for shard in range(shards):
+            shardPath(folder, shard, "").mkdir(parents=True)
+
+        splitTasks = [(index, path, folder, shards) for index, path in enumerate(paths)]
+        mergeTasks = [(folder, shard, len(paths)) for shard in range(shards)]
+        if processes == 1:
+            for task in splitTasks:
+                splitPolicy(task)
+            counts = [mergeShard(task) for task in mergeTasks]
+        else:
+            from multiprocessing import Pool
+            with Pool(processes) as pool:
+                pool.map(splitPolicy, splitTasks)
+                counts = pool.map(mergeShard, mergeTasks)
+
+        # The output is written streaming the shards: values first, then the number of updates
+        writeDictStreams(output, shardItems(folder, shards, 0), shardItems(folder, shards, 1), header=header)
+        return sum(counts)
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Merge policies trained separately for the same player")
+    parser.add_argument("output", help="path of the merged policy")
+    parser.add_argument("inputs", nargs="+", help="paths of the policies to merge (in a single file or in shards)")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS, help="number of shards of the states")
+    parser.add_argument("--processes", type=int, default=None, help="number of worker processes")
+    arguments = parser.parse_args()
+
+    print("Merging...")
+    count = mergePolicies(arguments.inputs, arguments.output, arguments.shards, arguments.processes)
+    print("Merged policy saved: " + str(count) + " states")
@@ -0,0 +1,163 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+
+Statistics of the saved policies, to plan the memory of the training and to decide when a policy is too large:
+    -> number of states, bytes in the file and estimated bytes in memory of each ply
+    -> distribution of the values and fraction of the states updated only once
+    -> states in both the policies, useful for the policies to merge (the policies of the player with X and of the
+       player with O have no common state, X saves the boards with an odd number of symbols: they aren't compared)
+    -> estimated memory saved by saving the states in compact arrays
+The policy files (or the shards of a sharded policy) are read streaming the pickled items, and the states of the
+first policy are kept in memory only to compute the common states, a part at a time: at most max-states states
+are in memory.
+
+Usage (by default the policies of the two artificial players):
+    py PolicyStats.py [<policy> [<other policy>]] [--max-states N]
+"""
+
+import sys
+import argparse
+
+import numpy as np
+
+from ShardedPolicy import policyItems
+from Zobrist import ply
+
+# Estimated bytes of a state in a dictionary of CPython besides the key and the value: 24 bytes of the entry plus
+# the index, with the table between 1/3 and 2/3 full
+DICT_ENTRY_BYTES = 48
+# Bytes of a state in compact sorted arrays: 64 bits key, 32 bits value, 32 bits number of updates
+COMPACT_ENTRY_BYTES = 16
+# Bins of the histogram of the values (the reward is added at every step: the values are between -4 / (1 - gamma)
+# and 2 / (1 - gamma))
+VALUE_BINS = np.linspace(-40, 40, 21)
+
+
+class PolicyStatistics:
+    def __init__(self, path):
+        """
+        Read the policy and compute its statistics
+        :param path: path of the policy (see ShardedPolicy.policyFiles)
+        """
+        self.path = path
+        # Ply -> [number of values, bytes in the file, estimated bytes in memory]
+        self.plies = {}
+        self.values = 0
+        self.visits = 0
+        self.updatedOnce = 0
+        self.valueCounts = np.zeros(len(VALUE_BINS) + 1, dtype=np.int64)
+        self.valueSum = 0.0
+        self.valueMin = None
+        self.valueMax = None
+
+        for index, state, value, size in policyItems(path):
+            row = self.plies.setdefault(ply(state), [0, 0, 0])
+            row[1] += size
+            row[2] += sys.getsizeof(state) + sys.getsizeof(value) + DICT_ENTRY_BYTES
+            if index == 0:
+                row[0] += 1
+                self.values += 1
+                self.valueSum += value
+                self.valueMin = value if self.valueMin is None else min(self.valueMin, value)
+                self.valueMax = value if self.valueMax is None else max(self.valueMax, value)
+                self.valueCounts[np.searchsorted(VALUE_BINS, value, side="right")] += 1
+            else:
+                self.visits += 1
+                if value == 1:
+                    self.updatedOnce += 1
+
+    def memory(self):
+        """
+        :return: estimated bytes of the policy in memory
+        """
+        return sum(row[2] for row in self.plies.values())
+
+    def report(self):
+        """
+        :return: the statistics as text
+        """
+        lines = ["Policy " + str(self.path) + ": " + str(self.values) + " states",
+                 "{:>5} {:>10} {:>12} {:>12}".format("ply", "states", "file B/st", "memory B/st")]
+        for statePly, (states, fileBytes, memoryBytes) in sorted(self.plies.items()):
+            lines.append("{:>5} {:>10} {:>12.1f} {:>12.1f}".format(statePly, states, fileBytes / max(states, 1),
+                                                                   memoryBytes / max(states, 1)))
+        memory = self.memory()
+        lines.append("Estimated memory: {:.1f} MB".format(memory / 2 ** 20))
+
+        if self.values > 0:
+            lines.append("Values: min {:.4f}, mean {:.4f}, max {:.4f}".format(
+                self.valueMin, self.valueSum / self.values, self.valueMax))
+            edges = ["-inf"] + ["{:g}".format(edge) for edge in VALUE_BINS] + ["inf"]
+            for index, count in enumerate(self.valueCounts):
+                if count > 0:
+                    lines.append("  [{}, {}): {} ({:.1%})".format(edges[index], edges[index + 1], count,
+                                                                   count / self.values))
+        if self.visits > 0:
+            lines.append("States updated only once: {} ({:.1%})".format(self.updatedOnce,
+                                                                        self.updatedOnce / self.visits))
+        else:
+            lines.append("States updated only once: unknown (saved without the number of updates)")
+
+        compact = self.values * COMPACT_ENTRY_BYTES
+        lines.append("Compact arrays of keys, values and updates: {:.1f} MB ({:.1f} MB saved)".format(
+            compact / 2 ** 20, (memory - compact) / 2 ** 20))
+        return "\n".join(lines)
+
+    def parities(self):
+        """
+        :return: the set of the parities (0 or 1) of the numbers of symbols of the states
+        """
+        return set(statePly % 2 for statePly in self.plies)
+
+
+def commonStates(path, otherPath, states, maxStates=1000000):
+    """
+    Method that counts the states in both the policies: the states of the first policy are split in parts of at most
+    maxStates states (hash modulo the number of parts), and each part is compared with the other policy
+    :param path: path of the first policy
+    :param otherPath: path of the other policy
+    :param states: number of states of the first policy
+    :param maxStates: maximum number of states in memory
+    :return: a dictionary ply -> number of common states
+    """
+    parts = max(1, -(-states // maxStates))
+    common = {}
+    for part in range(parts):
+        keys = set(state for index, state, _, _ in policyItems(path) if index == 0 and state % parts == part)
+        for index, state, _, _ in policyItems(otherPath):
+            if index == 0 and state in keys:
+                common[ply(state)] = common.get(ply(state), 0) + 1
+    return common
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Statistics of the saved policies")
+    parser.add_argument("policies", nargs="*", default=["Files/policy_U-0318", "Files/policy_U-0314"],
+                        help="paths of one or two policies (in a single file or in shards)")
+    parser.add_argument("--max-states", type=int, default=1000000,
+                        help="maximum number of states in memory to find the states in both the policies")
+    arguments = parser.parse_args()
+    if len(arguments.policies) > 2:
+        parser.error("at most two policies can be compared")
+
+    statistics = []
+    for path in arguments.policies:
+        statistics.append(PolicyStatistics(path))
+        print(statistics[-1].report())
+        print()
+    if len(statistics) == 2 and not statistics[0].parities() & statistics[1].parities():
+        # Every state of a policy has a number of symbols of a different parity: none can be in the other one
+        print("States in both the policies: 0 (the boards have numbers of symbols of different parity)")
+    elif len(statistics) == 2:
+        common = commonStates(arguments.policies[0], arguments.policies[1], statistics[0].values,
+                              arguments.max_states)
+        total = sum(common.values())
+        print("States in both the policies: {} ({:.1%} of the first, {:.1%} of the second)".format(
+            total, total / max(statistics[0].values, 1), total / max(statistics[1].values, 1)))
+        for statePly, count in sorted(common.items()):
+            print("{:>5} {:>10}".format(statePly, count))
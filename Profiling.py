@@ -0,0 +1,128 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+"""
+
+import io
+import os
+import time
+import cProfile
+import pstats
+import tracemalloc
+from pathlib import Path
+
+# Methods always reported, even if they are not among the slowest ones
+WATCHED_METHODS = ["winner", "completesLine", "chooseAction", "getHash", "feedReward"]
+
+# Number of lines in each section of the report
+REPORT_LINES = 25
+
+# Snapshot of the memory taken by the profiled function while its objects are alive (see snapshotMemory)
+liveSnapshot = None
+
+
+def snapshotMemory():
+    """
+    Method called by the profiled function at the end of its work, before the players and their tables are
+    released: the growth of the memory is measured with this snapshot (it does nothing if the memory isn't traced)
+    :return: nothing
+    """
+    global liveSnapshot
+    if tracemalloc.is_tracing():
+        liveSnapshot = tracemalloc.take_snapshot()
+
+
+def runProfiled(function, reportPath):
+    """
+    Method that runs a function with the profiler and the memory tracer and then writes the report
+    The report is written even if the function ends with an exception (e.g. exit() from the gui)
+    The memory is compared with the snapshot taken by snapshotMemory, or after the run if the function didn't take it
+    :param function: the function to run (without parameters)
+    :param reportPath: path of the report
+    :return: the value returned by the function
+    """
+    global liveSnapshot
+    liveSnapshot = None
+    # Keep enough frames to know which method caused each allocation
+    tracemalloc.start(10)
+    startSnapshot = tracemalloc.take_snapshot()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        return profiler.runcall(function)
+    finally:
+        elapsed = time.perf_counter() - start
+        endSnapshot = liveSnapshot if liveSnapshot is not None else tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        writeReport(reportPath, profiler, elapsed, startSnapshot, endSnapshot, peak)
+        print("Profile saved in " + str(reportPath))
+
+
+def watchedMethods(stats):
+    """
+    Method that sums the statistics of the watched methods of every class
+    :param stats: the pstats.Stats of the run
+    :return: a list of tuples (name, calls, own time, cumulative time) sorted by cumulative time
+    """
+    totals = {}
+    for (fileName, _, functionName), (_, calls, ownTime, cumulativeTime, _) in stats.stats.items():
+        if functionName not in WATCHED_METHODS:
+            continue
+        name = Path(fileName).stem + "." + functionName
+        total = totals.get(name, (0, 0.0, 0.0))
+        totals[name] = (total[0] + calls, total[1] + ownTime, total[2] + cumulativeTime)
+    rows = [(name,) + total for name, total in totals.items()]
+    return sorted(rows, key=lambda row: row[3], reverse=True)
+
+
+def writeReport(reportPath, profiler, elapsed, startSnapshot, endSnapshot, peak):
+    """
+    Method that writes the report of the profiled run
+    :param reportPath: path of the report
+    :param profiler: the cProfile.Profile of the run
+    :param elapsed: seconds of the run
+    :param startSnapshot: tracemalloc snapshot taken before the run
+    :param endSnapshot: tracemalloc snapshot taken at the end of the run
+    :param peak: peak of the memory traced (bytes)
+    :return: nothing
+    """
+    out = io.StringIO()
+    out.write("Total time: {:.3f} s\n\n".format(elapsed))
+
+    stats = pstats.Stats(profiler, stream=out)
+    out.write("Watched methods (sorted by cumulative time)\n")
+    out.write("{:<40} {:>12} {:>12} {:>12}\n".format("method", "calls", "own s", "cumulative s"))
+    for name, calls, ownTime, cumulativeTime in watchedMethods(stats):
+        out.write("{:<40} {:>12} {:>12.3f} {:>12.3f}\n".format(name, calls, ownTime, cumulativeTime))
+    out.write("\n")
+
+    out.write("Hotspots by cumulative time\n")
+    stats.sort_stats("cumulative").print_stats(REPORT_LINES)
+    out.write("Hotspots by own time\n")
+    stats.sort_stats("tottime").print_stats(REPORT_LINES)
+
+    out.write("Memory: peak {:.1f} MiB\n\n".format(peak / 2 ** 20))
+    out.write("Allocation sites with the largest growth\n")
+    for stat in endSnapshot.compare_to(startSnapshot, "lineno")[:REPORT_LINES]:
+        out.write(str(stat) + "\n")
+    out.write("\n")
+
+    # The value tables grow inside the methods of the players: group the growth by the whole stack
+    playerFilter = [tracemalloc.Filter(True, "*" + os.sep + "Player.py")]
+    out.write("Growth of the value tables (allocations in Player.py, with the calling stack)\n")
+    growth = endSnapshot.filter_traces(playerFilter).compare_to(startSnapshot.filter_traces(playerFilter),
+                                                                "traceback")
+    for stat in growth[:5]:
+        out.write(str(stat) + "\n")
+        for line in stat.traceback.format(most_recent_first=True):
+            out.write("    " + line + "\n")
+    out.write("\n")
+
+    Path(reportPath).parent.mkdir(parents=True, exist_ok=True)
+    with open(reportPath, 'w') as file:
+        file.write(out.getvalue())
@@ -0,0 +1,273 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+
+Policy saved in one shard for each ply (number of symbols on the board, read from the top bits of the hash):
+    <policy>.shards/manifest -> header of the board and number of states of each shard
+    <policy>.shards/ply_<n> -> the values and the number of updates of the states with n symbols (a policy file)
+A shard is read from the disk the first time a state with its ply is needed, the shards not changed since the
+last save can be unloaded when too many states are in memory, and only the changed shards are written again.
+The tools that read the saved policies without a player (statistics, merge) use policyFiles, policyHeader and
+policyItems, which accept a policy saved in a single file or in shards.
+"""
+
+import os
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from pathlib import Path
+
+from Storage import writeAtomically, readPickled, writePolicyFile, readPolicyFile, readPolicyHeader, readDictStreams
+from Zobrist import ply, legacyHash
+
+
+def shardsFolder(path):
+    """
+    :param path: is the path of the policy saved in a single file
+    :return: the path of the folder with the shards of the same policy
+    """
+    return Path(str(path) + ".shards")
+
+
+class ShardView(MutableMapping):
+    def __init__(self, policy, position):
+        """
+        Initialize the dictionary-like view of one of the tables of a sharded policy
+        :param policy: the ShardedPolicy
+        :param position: 0 for the values, 1 for the number of updates
+        """
+        self.policy = policy
+        self.position = position
+
+    def get(self, state, default=None):
+        shard = self.policy.shard(ply(state))
+        if shard is None:
+            return default
+        return shard[self.position].get(state, default)
+
+    def __getitem__(self, state):
+        shard = self.policy.shard(ply(state))
+        if shard is None:
+            raise KeyError(state)
+        return shard[self.position][state]
+
+    def __setitem__(self, state, value):
+        statePly = ply(state)
+        table = self.policy.shard(statePly, True)[self.position]
+        if self.position == 0 and state not in table:
+            self.policy.loadedStates += 1
+        table[state] = value
+        self.policy.dirty.add(statePly)
+
+    def __delitem__(self, state):
+        statePly = ply(state)
+        shard = self.policy.shard(statePly)
+        if shard is None:
+            raise KeyError(state)
+        del shard[self.position][state]
+        if self.position == 0:
+            self.policy.loadedStates -= 1
+        self.policy.dirty.add(statePly)
+
+    def __iter__(self):
+        # One shard at a time: the shards already visited can be unloaded
+        for shardPly in self.policy.plies():
+            yield from list(self.policy.shard(shardPly)[self.position])
+
+    def __len__(self):
+        return sum(self.policy.shardSize(shardPly)[self.position] for shardPly in self.policy.plies())
+
+
+class ShardedPolicy:
+    def __init__(self, folder, header=None, maxStates=None):
+        """
+        Open the shards of a policy (only the manifest is read)
+        :param folder: the folder of the shards (see shardsFolder)
+        :param header: the header of the board (see BoardConfig), None for the classic board
+        :param maxStates: number of states in memory over which the shards not changed are unloaded
+            (None to keep every shard read)
+        """
+        self.folder = Path(folder)
+        self.header = header
+        self.maxStates = maxStates
+
+        # Ply -> (number of values, number of updates) of the shards on the disk
+        self.saved = {}
+        manifest = readPickled(self.folder / "manifest")
+        if manifest is not None:
+            if manifest["header"] != header:
+                raise ValueError("The policy " + str(folder) + " was trained on a different board")
+            self.saved = dict(manifest["shards"])
+
+        # Ply -> (state -> value, state -> number of updates), the least recently used first
+        self.shards = OrderedDict()
+        # Plies of the shards changed since the last save
+        self.dirty = set()
+        # Number of values in the shards in memory
+        self.loadedStates = 0
+        # The last shard used (most lookups are for the same ply)
+        self.lastPly = None
+        self.lastShard = None
+
+        # The tables used by the player
+        self.values = ShardView(self, 0)
+        self.visits = ShardView(self, 1)
+
+    def shardPath(self, shardPly):
+        """
+        :param shardPly: ply of the shard
+        :return: the path of the file of the shard
+        """
+        return self.folder / ("ply_" + str(shardPly))
+
+    def plies(self):
+        """
+        :return: the sorted plies of all the shards, in memory or on the disk
+        """
+        return sorted(set(self.saved) | set(self.shards))
+
+    def shardSize(self, shardPly):
+        """
+        :param shardPly: ply of the shard
+        :return: a pair (number of values, number of updates) of the shard, without reading it
+        """
+        shard = self.shards.get(shardPly)
+        if shard is not None:
+            return len(shard[0]), len(shard[1])
+        return self.saved.get(shardPly, (0, 0))
+
+    def shard(self, shardPly, create=False):
+        """
+        Method that returns the tables of a ply, reading them from the disk the first time
+        :param shardPly: ply of the shard
+        :param create: if True an empty shard is created when the ply has no states
+        :return: a pair (state -> value, state -> number of updates), None if the ply has no states and not create
+        """
+        if shardPly == self.lastPly:
+            return self.lastShard
+        shard = self.shards.get(shardPly)
+        if shard is not None:
+            self.shards.move_to_end(shardPly)
+        else:
+            if shardPly in self.saved:
+                shard = readPolicyFile(self.shardPath(shardPly))[1:]
+            elif create:
+                shard = ({}, {})
+            else:
+                return None
+            self.shards[shardPly] = shard
+            self.loadedStates += len(shard[0])
+            self.unloadCold()
+        self.lastPly = shardPly
+        self.lastShard = shard
+        return shard
+
+    def unloadCold(self):
+        """
+        Method that unloads the least recently used shards not changed since the last save,
+        until the number of states in memory is under the limit
+        :return: nothing
+        """
+        if self.maxStates is None:
+            return
+        # The most recent shard is the one requested now
+        for shardPly in list(self.shards)[:-1]:
+            if self.loadedStates <= self.maxStates:
+                return
+            if shardPly not in self.dirty:
+                self.loadedStates -= len(self.shards.pop(shardPly)[0])
+                if shardPly == self.lastPly:
+                    self.lastPly = self.lastShard = None
+
+    def replace(self, states_value, states_visits):
+        """
+        Method that replaces the whole policy (e.g. the tables loaded from a single file)
+        :param states_value: dictionary state -> value
+        :param states_visits: dictionary state -> number of updates
+        :return: nothing
+        """
+        shards = {}
+        for state, value in states_value.items():
+            shards.setdefault(ply(state), ({}, {}))[0][state] = value
+        for state, visits in states_visits.items():
+            shards.setdefault(ply(state), ({}, {}))[1][state] = visits
+        # The shards on the disk that are not in the new policy are removed at the next save
+        for shardPly in self.saved:
+            shards.setdefault(shardPly, ({}, {}))
+        self.shards = OrderedDict(sorted(shards.items()))
+        self.dirty = set(self.shards)
+        self.loadedStates = len(states_value)
+        self.lastPly = self.lastShard = None
+
+    def save(self):
+        """
+        Method that writes the shards changed since the last save and then the manifest
+        :return: the path of the manifest (it changes at every save)
+        """
+        self.folder.mkdir(parents=True, exist_ok=True)
+        for shardPly in sorted(self.dirty):
+            states_value, states_visits = self.shards[shardPly]
+            if states_value or states_visits:
+                writePolicyFile(self.shardPath(shardPly), states_value, states_visits, self.header)
+                self.saved[shardPly] = (len(states_value), len(states_visits))
+            elif shardPly in self.saved:
+                os.remove(self.shardPath(shardPly))
+                del self.saved[shardPly]
+        self.dirty.clear()
+
+        manifestPath = self.folder / "manifest"
+        writeAtomically(manifestPath, {"header": self.header, "shards": dict(self.saved)})
+        self.unloadCold()
+        return manifestPath
+
+
+def savedShardsFolder(path):
+    """
+    :param path: path of a policy saved in a single file or of a sharded policy (or of its folder)
+    :return: the folder of the shards, None if the policy is saved in a single file
+    """
+    path = Path(path)
+    folder = path if path.suffix == ".shards" else shardsFolder(path)
+    if path.is_file() or not folder.is_dir():
+        return None
+    return folder
+
+
+def policyFiles(path):
+    """
+    :param path: path of a policy saved in a single file or of a sharded policy (or of its folder)
+    :return: the list of the files of the policy (one for each shard of a sharded policy)
+    """
+    folder = savedShardsFolder(path)
+    if folder is None:
+        return [Path(path)]
+    manifest = readPickled(folder / "manifest")
+    return [folder / ("ply_" + str(shardPly)) for shardPly in sorted(manifest["shards"])]
+
+
+def policyHeader(path):
+    """
+    :param path: path of the policy (see policyFiles)
+    :return: the header of the board of the policy (see BoardConfig), None for the classic board
+    """
+    folder = savedShardsFolder(path)
+    if folder is None:
+        return readPolicyHeader(path)
+    return readPickled(folder / "manifest")["header"]
+
+
+def policyItems(path):
+    """
+    Method that reads the items of a policy without loading it
+    :param path: path of the policy (see policyFiles)
+    :return: a generator of tuples (0 for the values or 1 for the number of updates, state, value, bytes in the file)
+    """
+    for file in policyFiles(path):
+        for index, state, value, size in readDictStreams(file):
+            if isinstance(state, str):
+                # Policies saved by the first versions use the printed board as hash
+                state = legacyHash(state)
+            yield index, state, value, size
@@ -0,0 +1,171 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+
+Exploring starts: some training games start from a position in the middle of the game instead of the empty board.
+The positions are taken from logged games (one sequence of columns for each line, as for the tablebase) or reached
+with random games, and are chosen more often when the player that reached them has updated them fewer times.
+"""
+
+import numpy as np
+
+from Enumerations import CellState
+from Zobrist import childHash
+
+# Number of games after which the weights of the positions are computed again
+REFRESH_GAMES = 100
+
+
+class StartPool:
+    def __init__(self, config, size=10000, gamesPath=None, minPly=4, maxPly=None):
+        """
+        Initialize the pool of the start positions
+        :param config: the BoardConfig of the game
+        :param size: maximum number of positions in the pool
+        :param gamesPath: file with the logged games (None to reach the positions with random games)
+        :param minPly: minimum number of symbols on the board of a position
+        :param maxPly: maximum number of symbols on the board of a position (None for 2/3 of the cells)
+        """
+        self.config = config
+        self.minPly = minPly
+        self.maxPly = config.cells * 2 // 3 if maxPly is None else maxPly
+
+        # Columns chosen to reach each position, with the hash of the board
+        self.moves = []
+        self.hashes = []
+        seen = set()
+        for moves in (self.loggedPositions(gamesPath, size) if gamesPath is not None else self.randomPositions(size)):
+            key = self.positionHash(moves)
+            if key is not None and key not in seen:
+                seen.add(key)
+                self.moves.append(moves)
+                self.hashes.append(key)
+        if len(self.moves) == 0:
+            raise ValueError("No start position found")
+
+        self.weights = np.full(len(self.moves), 1 / len(self.moves))
+        self.gamesSinceRefresh = None
+
+    def positionHash(self, moves):
+        """
+        Method that replays the actions from the empty board
+        :param moves: list of the columns chosen, the first one by X
+        :return: the hash of the position, None if the game ended or an action is not valid
+        """
+        cells = [CellState.empty_Value] * self.config.cells
+        heights = [0] * self.config.cols
+        symbol = CellState.X_Value
+        key = 0
+        for y in moves:
+            if not 0 <= y < self.config.cols or heights[y] == self.config.rows:
+                return None
+            cell = heights[y] * self.config.cols + y
+            if self.config.completesLine(cells, cell, symbol):
+                return None
+            cells[cell] = int(symbol)
+            heights[y] += 1
+            key = childHash(key, self.config.zobrist, cell, symbol)
+            symbol = -symbol
+        if len(moves) == self.config.cells:
+            return None
+        return key
+
+    def randomPositions(self, number):
+        """
+        Method that plays random actions from the empty board
+        :param number: number of positions to generate
+        :return: a generator of lists of columns
+        """
+        for _ in range(number):
+            length = np.random.randint(self.minPly, self.maxPly + 1)
+            heights = [0] * self.config.cols
+            moves = []
+            while len(moves) < length:
+                y = int(np.random.choice([c for c in range(self.config.cols) if heights[c] < self.config.rows]))
+                heights[y] += 1
+                moves.append(y)
+            yield moves
+
+    def loggedPositions(self, path, number):
+        """
+        Method that reads the positions reached during the logged games
+        The positions are sampled while the file is read (reservoir sampling): only the ones kept are in memory
+        :param path: file with one game for each line (the columns chosen, the first one by X)
+        :param number: maximum number of positions
+        :return: a list of lists of columns (the malformed lines are skipped and counted)
+        """
+        positions = []
+        seen = 0
+        malformed = 0
+        with open(path) as file:
+            for line in file:
+                try:
+                    moves = [int(move) for move in line.strip()]
+                except ValueError:
+                    # A malformed line (e.g. written while the log was truncated) is skipped, not the whole file
+                    malformed += 1
+                    continue
+                # Every position of the game with the right number of symbols, each one is kept with
+                # probability number / positions seen
+                for length in range(self.minPly, min(self.maxPly, len(moves)) + 1):
+                    if seen < number:
+                        positions.append(moves[:length])
+                    else:
+                        index = np.random.randint(seen + 1)
+                        if index < number:
+                            positions[index] = moves[:length]
+                    seen += 1
+        if malformed > 0:
+            print(str(malformed) + " malformed lines skipped in " + str(path))
+        return positions
+
+    def refreshWeights(self, player1, player2):
+        """
+        Method that weights each position with 1 / (1 + number of updates of the position), read in the table
+        of the player that did the last action
+        :param player1: the player with X
+        :param player2: the player with O
+        :return: nothing
+        """
+        counts = np.empty(len(self.moves))
+        for index, (moves, key) in enumerate(zip(self.moves, self.hashes)):
+            player = player1 if len(moves) % 2 == 1 else player2
+            counts[index] = player.states_visits.get(key, 0)
+        weights = 1 / (1 + counts)
+        self.weights = weights / weights.sum()
+
+    def choose(self, player1, player2):
+        """
+        Method that chooses the start position of a game
+        :param player1: the player with X
+        :param player2: the player with O
+        :return: the list of the columns chosen to reach the position
+        """
+        if self.gamesSinceRefresh is None or self.gamesSinceRefresh >= REFRESH_GAMES:
+            self.refreshWeights(player1, player2)
+            self.gamesSinceRefresh = 0
+        self.gamesSinceRefresh += 1
+        return self.moves[np.random.choice(len(self.moves), p=self.weights)]
+
+    def checkpointSnapshot(self):
+        """
+        Method that takes the state of the pool saved in the training checkpoints (see Checkpointer)
+        :return: dictionary with the positions, their weights and the games since the last refresh of the weights
+        """
+        return {"moves": list(self.moves), "hashes": list(self.hashes), "weights": self.weights.copy(),
+                "gamesSinceRefresh": self.gamesSinceRefresh}
+
+    def restoreCheckpointSnapshot(self, snapshot):
+        """
+        Method that restores the state of the pool taken with checkpointSnapshot
+        :param snapshot: the state of the pool
+        :return: nothing
+        """
+        self.moves = snapshot["moves"]
+        self.hashes = snapshot["hashes"]
+        self.weights = snapshot["weights"]
+        self.gamesSinceRefresh = snapshot["gamesSinceRefresh"]
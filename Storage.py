@@ -0,0 +1,208 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+"""
+
+import os
+import pickle
+import pickletools
+import tempfile
+from pathlib import Path
+
+from Zobrist import legacyHash
+
+# Permissions of the new files (mkstemp creates them readable only by the owner): read once, since changing the
+# umask to read it isn't safe while the checkpoints are written in background
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def replaceAtomically(path, write):
+    """
+    Method that writes a file in a temporary file in the same folder and then renames it
+    :param path: is the path of the file to write
+    :param write: function that writes the content in the opened (binary) file
+    :return: nothing
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # The temporary file must be on the same file system to make the rename atomic
+    fd, tmpPath = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        # Keep the permissions of the file replaced, or give the ones of a file created with open()
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o666 & ~UMASK
+        os.chmod(tmpPath, mode)
+        os.replace(tmpPath, path)
+    except BaseException:
+        # Never leave the temporary file around
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+        raise
+
+
+def writeAtomically(path, *objects):
+    """
+    Method that pickles the objects in a file without ever leaving a half written file on the disk:
+        the objects are written in a temporary file in the same folder that is then renamed
+    :param path: is the path of the file to write
+    :param objects: are the objects to pickle (one after the other)
+    :return: nothing
+    """
+    def write(file):
+        for obj in objects:
+            pickle.dump(obj, file, protocol=pickle.HIGHEST_PROTOCOL)
+    replaceAtomically(path, write)
+
+
+def writeDictStreams(path, *itemStreams, header=None):
+    """
+    Method that pickles dictionaries without building them in memory: the items are written as they come
+    The file is read back with pickle.load, one dictionary for each stream
+    :param path: is the path of the file to write
+    :param itemStreams: are iterables of pairs (key, value), one for each dictionary
+    :param header: object pickled before the dictionaries (None to not write it)
+    :return: nothing
+    """
+    def write(file):
+        if header is not None:
+            pickle.dump(header, file, protocol=pickle.HIGHEST_PROTOCOL)
+        # Protocol 2 has no frames: the pickle of a dictionary is EMPTY_DICT followed by batches of
+        # MARK key value ... SETITEMS, and the pickle of a number doesn't use the memo
+        for items in itemStreams:
+            file.write(b'\x80\x02}')
+            batch = []
+            for key, value in items:
+                batch.append(pickle.dumps(key, protocol=2)[2:-1] + pickle.dumps(value, protocol=2)[2:-1])
+                if len(batch) == 1000:
+                    file.write(b'(' + b''.join(batch) + b'u')
+                    batch = []
+            if batch:
+                file.write(b'(' + b''.join(batch) + b'u')
+            file.write(b'.')
+    replaceAtomically(path, write)
+
+
+# Opcodes of the numbers and strings that can be the keys and the values of the pickled dictionaries
+SCALAR_OPCODES = {"BININT", "BININT1", "BININT2", "LONG1", "LONG4", "INT", "LONG", "BINFLOAT", "FLOAT",
+                  "BINUNICODE", "SHORT_BINUNICODE", "BINUNICODE8", "UNICODE", "NEWTRUE", "NEWFALSE", "NONE"}
+# Opcodes that don't change the content of the dictionaries
+IGNORED_OPCODES = {"PROTO", "FRAME", "MEMOIZE", "PUT", "BINPUT", "LONG_BINPUT", "EMPTY_DICT"}
+
+
+def readDictStreams(path):
+    """
+    Method that reads the items of the pickled dictionaries of a file without building the dictionaries:
+    the opcodes are read one at a time, so the memory doesn't depend on the size of the file
+    The objects that aren't dictionaries (e.g. the header of a policy) are skipped
+    :param path: is the path of the file
+    :return: a generator of tuples (index of the dictionary, key, value, bytes of the item in the file)
+    """
+    with open(path, 'rb') as file:
+        index = 0
+        # genops stops at the end of each pickled object
+        while file.peek(1):
+            isDict = None
+            # Pairs (number or string, position in the file) pushed after the last MARK
+            pending = []
+            for opcode, arg, position in pickletools.genops(file):
+                name = opcode.name
+                if isDict is None and name not in ("PROTO", "FRAME"):
+                    # The first object pushed tells the type of the pickled object
+                    isDict = name == "EMPTY_DICT"
+                if name in SCALAR_OPCODES:
+                    pending.append((arg, position))
+                elif name == "MARK":
+                    pending = []
+                elif name in ("SETITEM", "SETITEMS"):
+                    for item in range(0, len(pending) - 1, 2):
+                        end = pending[item + 2][1] if item + 2 < len(pending) else position
+                        yield index, pending[item][0], pending[item + 1][0], end - pending[item][1]
+                    pending = []
+                elif name not in IGNORED_OPCODES and name != "STOP" and isDict:
+                    raise ValueError("The dictionaries in " + str(path) + " contain objects that aren't numbers")
+            if isDict:
+                index += 1
+
+
+def readPickled(path):
+    """
+    Method that reads the first object pickled in a file
+    :param path: is the path of the file
+    :return: the object, None if the file doesn't exist
+    """
+    if not Path(path).is_file():
+        return None
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+
+def writePolicyFile(path, states_value, states_visits, header=None):
+    """
+    Method that saves a policy: the values are the first object in the file (so the first versions can read it),
+    the number of updates of each state follows
+    The policies of the boards different from the classic one start with the header of the board
+    :param path: is the path of the file
+    :param states_value: dictionary state -> value
+    :param states_visits: dictionary state -> number of updates
+    :param header: the header of the board (see BoardConfig), None for the classic board
+    :return: nothing
+    """
+    if header is None:
+        writeAtomically(path, states_value, states_visits)
+    else:
+        writeAtomically(path, header, states_value, states_visits)
+
+
+def readPolicyHeader(path):
+    """
+    Method that reads the header of the board of a policy without reading the values: the first opcodes of the
+    file tell if it starts with the header (a tuple that starts with "board", see BoardConfig) or with the values
+    :param path: is the path of the file
+    :return: the header (see BoardConfig), None for the policies of the classic board
+    """
+    with open(path, 'rb') as file:
+        for opcode, arg, position in pickletools.genops(file):
+            if opcode.name not in ("PROTO", "FRAME", "MARK"):
+                break
+        if arg != "board":
+            return None
+        # Only the header is read, it's a few bytes
+        file.seek(0)
+        return pickle.load(file)
+
+
+def readPolicyFile(path):
+    """
+    Method that reads a policy saved by any version
+    :param path: is the path of the file
+    :return: a tuple (header of the board, state -> value, state -> number of updates): the header is None for the
+        classic board (see BoardConfig), the number of updates is empty if not saved
+    """
+    with open(path, 'rb') as file:
+        header = None
+        states_value = pickle.load(file)
+        if isinstance(states_value, tuple):
+            # The values follow the header of the board
+            header = states_value
+            states_value = pickle.load(file)
+        try:
+            states_visits = pickle.load(file)
+        except EOFError:
+            states_visits = {}
+
+    # Policies saved by the first versions use the printed board as hash (all the keys, it's enough to check one)
+    if isinstance(next(iter(states_value), None), str):
+        states_value = {legacyHash(state) if isinstance(state, str) else state: value
+                        for state, value in states_value.items()}
+    return header, states_value, states_visits
@@ -0,0 +1,330 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+
+Endgame tablebase: every position with few empty cells is solved exactly (win, draw or loss for the player
+to move and the number of moves to the end of the game) and saved in a sorted table that is memory mapped
+and searched with a binary search.
+
+Generation of the table:
+    py Tablebase.py <maximum number of empty cells> [--seeds N] [--games file] [--processes P]
+                    [--rows R] [--cols C] [--k K]
+"""
+
+import argparse
+from pathlib import Path
+import numpy as np
+
+from Enumerations import CellState
+from Board import DEFAULT_CONFIG, boardConfig, BOARD_ROWS, BOARD_COLS, LINE_LENGTH
+from Storage import replaceAtomically
+from Zobrist import boardHash, childHash, ply
+
+# Where the table of the classic board is saved
+TABLEBASE_PATH = "Files/tablebase.npy"
+
+# One entry for each solved position, sorted by key
+ENTRY_TYPE = np.dtype([("key", "<u8"), ("value", "i1"), ("distance", "u1")])
+
+
+def tablebasePath(config=DEFAULT_CONFIG):
+    """
+    :param config: the BoardConfig of the game
+    :return: the path of the table of the board
+    """
+    return TABLEBASE_PATH[:-len(".npy")] + config.tag + ".npy"
+
+
+class EndgameSolver:
+    def __init__(self, config=DEFAULT_CONFIG):
+        """
+        Initialize the solver of the endgames
+        :param config: the BoardConfig of the game
+        """
+        self.config = config
+        self.rows = config.rows
+        self.cols = config.cols
+        self.zobrist = config.zobrist
+
+        # Hash -> (value, distance) of the positions already solved
+        self.solved = {}
+
+    def isWin(self, cells, cell, symbol):
+        """
+        Check if the symbol just added in a cell completes a line
+        :param cells: the flattened board
+        :param cell: the cell of the last action
+        :param symbol: the symbol added
+        :return: True if the player with symbol won, False otherwise
+        """
+        return self.config.completesLine(cells, cell, symbol)
+
+    def solve(self, cells, heights, symbol, key):
+        """
+        Solve a position with a complete search of the tree (the results are saved in self.solved)
+        :param cells: the flattened board (list), restored before returning
+        :param heights: first free row of each column (list), restored before returning
+        :param symbol: symbol of the player to move
+        :param key: hash of the board
+        :return: a pair (value, distance): value is 1 if the player to move wins, 0 if draw, -1 if he loses,
+            distance is the number of moves until the end of the game with the best play of both the players
+        """
+        result = self.solved.get(key)
+        if result is not None:
+            return result
+
+        best = None
+        for y in range(self.cols):
+            if heights[y] == self.rows:
+                continue
+            cell = heights[y] * self.cols + y
+            cells[cell] = symbol
+            heights[y] += 1
+            childKey = childHash(key, self.zobrist, cell, symbol)
+
+            if self.isWin(cells, cell, symbol):
+                result = (1, 1)
+            elif ply(childKey) == self.rows * self.cols:
+                # Full board
+                result = (0, 1)
+            else:
+                value, distance = self.solve(cells, heights, -symbol, childKey)
+                result = (-value, distance + 1)
+
+            heights[y] -= 1
+            cells[cell] = CellState.empty_Value
+
+            if best is None or isBetter(result, best):
+                best = result
+                # Nothing is better than winning with the next action
+                if best == (1, 1):
+                    break
+
+        self.solved[key] = best
+        return best
+
+    def solveMoves(self, moves):
+        """
+        Solve the position reached playing a sequence of actions
+        :param moves: the columns chosen (list of numbers or, if there are less than 11 columns, a string),
+            the first one by X
+        :return: nothing (the position is skipped if the game is already ended)
+        """
+        cells = [CellState.empty_Value] * (self.rows * self.cols)
+        heights = [0] * self.cols
+        symbol = CellState.X_Value
+        key = 0
+        for move in moves:
+            y = int(move)
+            cell = heights[y] * self.cols + y
+            cells[cell] = symbol
+            heights[y] += 1
+            key = childHash(key, self.zobrist, cell, symbol)
+            if self.isWin(cells, cell, symbol):
+                return
+            symbol = -symbol
+        if ply(key) < self.rows * self.cols:
+            self.solve(cells, heights, symbol, key)
+
+
+def isBetter(result, other):
+    """
+    Compare the results of two actions for the player that chooses
+    :param result: pair (value, distance)
+    :param other: pair (value, distance)
+    :return: True if result is better than other
+    """
+    if result[0] != other[0]:
+        return result[0] > other[0]
+    if result[0] > 0:
+        # Win as soon as possible
+        return result[1] < other[1]
+    if result[0] < 0:
+        # Lose as late as possible
+        return result[1] > other[1]
+    return False
+
+
+def randomSeeds(number, maxEmpty, config=DEFAULT_CONFIG):
+    """
+    Method that plays random games until only maxEmpty cells are left
+    :param number: number of positions to generate
+    :param maxEmpty: number of empty cells of the positions
+    :param config: the BoardConfig of the game
+    :return: a list of lists, each one with the columns chosen to reach a position
+    """
+    solver = EndgameSolver(config)
+    board_rows, board_cols = config.rows, config.cols
+    seeds = []
+    while len(seeds) < number:
+        cells = [CellState.empty_Value] * (board_rows * board_cols)
+        heights = [0] * board_cols
+        symbol = CellState.X_Value
+        moves = []
+        while len(moves) < board_rows * board_cols - maxEmpty:
+            y = int(np.random.choice([c for c in range(board_cols) if heights[c] < board_rows]))
+            cell = heights[y] * board_cols + y
+            cells[cell] = symbol
+            heights[y] += 1
+            moves.append(y)
+            if solver.isWin(cells, cell, symbol):
+                # The game ended too early: try again
+                break
+            symbol = -symbol
+        else:
+            seeds.append(moves)
+    return seeds
+
+
+def solveSeeds(task):
+    """
+    Method executed by the worker processes: solve all the positions after some sequences of actions
+    :param task: tuple (BoardConfig, list of sequences of actions)
+    :return: dictionary hash -> (value, distance) with every position solved
+    """
+    config, seeds = task
+    solver = EndgameSolver(config)
+    for moves in seeds:
+        solver.solveMoves(moves)
+    return solver.solved
+
+
+def generate(seeds, config=DEFAULT_CONFIG, processes=None, path=None):
+    """
+    Method that solves every position reachable from the seeds and saves the table
+    :param seeds: list of sequences of actions (see EndgameSolver.solveMoves) reaching the positions to solve
+    :param config: the BoardConfig of the game
+    :param processes: number of worker processes (None for one for each cpu)
+    :param path: path of the table (None for the path of the board, see tablebasePath)
+    :return: number of positions in the table
+    """
+    from multiprocessing import Pool
+
+    if path is None:
+        path = tablebasePath(config)
+    chunks = [seeds[i:i + 16] for i in range(0, len(seeds), 16)]
+    solved = {}
+    with Pool(processes) as pool:
+        for result in pool.imap_unordered(solveSeeds, [(config, chunk) for chunk in chunks]):
+            solved.update(result)
+
+    table = np.empty(len(solved), dtype=ENTRY_TYPE)
+    table["key"] = np.fromiter(solved.keys(), dtype=np.uint64, count=len(solved))
+    results = np.array(list(solved.values()), dtype=np.int16).reshape(-1, 2)
+    table["value"] = results[:, 0]
+    table["distance"] = results[:, 1]
+    table.sort(order="key")
+
+    # Write the table in a temporary file, then rename it
+    replaceAtomically(path, lambda file: np.save(file, table))
+    return len(table)
+
+
+class Tablebase:
+    def __init__(self, path=TABLEBASE_PATH, config=DEFAULT_CONFIG):
+        """
+        Open the table (memory mapped: only the pages searched are read from the disk)
+        :param path: path of the table
+        :param config: the BoardConfig of the game
+        """
+        self.table = np.load(path, mmap_mode='r')
+        self.keys = self.table["key"]
+        self.rows = config.rows
+        self.cols = config.cols
+        self.zobrist = config.zobrist
+        # The ply is in the top bits of the keys: the first key has the most empty cells
+        self.maxEmpty = config.cells - ply(int(self.keys[0])) if len(self.keys) > 0 else -1
+
+    def probe(self, keys):
+        """
+        Search some positions in the table
+        :param keys: list of hashes of the boards
+        :return: a list with a pair (value, distance) for each position, None for the positions not in the table
+        """
+        keys = np.array(keys, dtype=np.uint64)
+        indexes = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        found = self.keys[indexes] == keys
+        values = self.table["value"][indexes]
+        distances = self.table["distance"][indexes]
+        return [(int(values[i]), int(distances[i])) if found[i] else None for i in range(len(keys))]
+
+    def bestAction(self, positions, board, symbol):
+        """
+        Method that chooses the perfect action if the position is in the table
+        :param positions: is a list containing all the positions in which is possible perform an action
+        :param board: is the board of the game
+        :param symbol: symbol of the player to move
+        :return: the column chosen, None if the position is not in the table
+        """
+        empty = np.count_nonzero(board == CellState.empty_Value)
+        if empty > self.maxEmpty:
+            return None
+
+        # Hashes of the boards after each action
+        current = boardHash(board)
+        heights = np.count_nonzero(board != CellState.empty_Value, axis=0)
+        children = [childHash(current, self.zobrist, heights[y] * self.cols + y, symbol) for y in positions]
+        # The actions that win immediately are checked by the player before probing the table,
+        # so every child is in the table, except the full board when only one cell is empty
+        results = self.probe(children) if empty > 1 else [(0, 0)]
+
+        best = None
+        action = None
+        for y, result in zip(positions, results):
+            if result is None:
+                return None
+            # The result in the table is for the opponent
+            result = (-result[0], result[1] + 1)
+            if best is None or isBetter(result, best):
+                best = result
+                action = y
+        return action
+
+
+def loadTablebase(config=DEFAULT_CONFIG, path=None):
+    """
+    Open the table if it was generated
+    :param config: the BoardConfig of the game
+    :param path: path of the table (None for the path of the board, see tablebasePath)
+    :return: the Tablebase, None if the file doesn't exist
+    """
+    if path is None:
+        path = tablebasePath(config)
+    if not Path(path).is_file():
+        return None
+    return Tablebase(path, config)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate the endgame tablebase")
+    parser.add_argument("empty", type=int, help="maximum number of empty cells of the positions")
+    parser.add_argument("--seeds", type=int, default=1000,
+                        help="number of positions reached with random games")
+    parser.add_argument("--games", default=None,
+                        help="file with sequences of actions (one for each line) reaching the positions to solve")
+    parser.add_argument("--processes", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--rows", type=int, default=BOARD_ROWS, help="number of rows of the board")
+    parser.add_argument("--cols", type=int, default=BOARD_COLS, help="number of columns of the board")
+    parser.add_argument("--k", type=int, default=LINE_LENGTH, help="number of symbols in a line to win")
+    arguments = parser.parse_args()
+    try:
+        config = boardConfig(arguments.rows, arguments.cols, arguments.k)
+    except ValueError as error:
+        parser.error(str(error))
+
+    seeds = randomSeeds(arguments.seeds, arguments.empty, config)
+    if arguments.games is not None:
+        with open(arguments.games) as file:
+            for line in file:
+                line = line.strip()
+                # Keep only the positions with few empty cells
+                if line and config.cells - len(line) <= arguments.empty:
+                    seeds.append(line)
+
+    print("Solving...")
+    count = generate(seeds, config, arguments.processes)
+    print("Tablebase saved: " + str(count) + " positions")
@@ -0,0 +1,90 @@
+"""
+Date: 19/09/2021
+Author: Matteo Nunziante
+Description: Four In A Line game
+Example of reinforcement learning applied to a game:
+    -> it's possible to train 2 players (one that start first and one that start for second)
+    -> the training can be between the 2 artificial player and also during the game with a human player
+"""
+
+from functools import lru_cache
+import numpy as np
+
+from Enumerations import CellState
+
+# The hash of a board is the xor of one random key for each occupied cell,
+# the number of symbols on the board (the ply) is kept in the top bits of the hash:
+# boards with a different number of symbols never collide and the ply can be read back from the hash
+PLY_SHIFT = 57
+PLY_UNIT = 1 << PLY_SHIFT
+CELLS_MASK = PLY_UNIT - 1
+
+
+@lru_cache(maxsize=None)
+def zobristTable(board_rows=6, board_cols=7):
+    """
+    Method that builds the random keys of the cells
+    The seed is fixed: the hashes are saved in the policies, so they must be the same in every process
+    :param board_rows: number of rows in the board
+    :param board_cols: number of columns in the board
+    :return: a tuple with, for each cell of the flattened board, the pair (key for X, key for O)
+    """
+    generator = np.random.RandomState(board_rows * 1000 + board_cols)
+    keys = generator.randint(1, PLY_UNIT, size=(board_rows * board_cols, 2), dtype=np.int64)
+    return tuple((int(x_key), int(o_key)) for x_key, o_key in keys)
+
+
+def pieceIndex(symbol):
+    """
+    :param symbol: symbol of a player
+    :return: the index of the key of the symbol in the pair of keys of a cell
+    """
+    return 0 if symbol == CellState.X_Value else 1
+
+
+def ply(boardHash):
+    """
+    :param boardHash: the hash of a board
+    :return: the number of symbols on the board
+    """
+    return boardHash >> PLY_SHIFT
+
+
+def boardHash(board):
+    """
+    Method that computes the hash of a board from scratch
+    :param board: the board of whom calculate the hash
+    :return: the hash of the board
+    """
+    table = zobristTable(board.shape[0], board.shape[1])
+    cells = board.reshape(-1)
+    result = 0
+    occupied = np.flatnonzero(cells)
+    for cell in occupied:
+        result ^= table[cell][pieceIndex(cells[cell])]
+    return result + len(occupied) * PLY_UNIT
+
+
+def childHash(parentHash, table, cell, symbol):
+    """
+    Method that derives the hash of a board after adding a symbol from the hash of the board before
+    :param parentHash: the hash of the board before the action
+    :param table: the keys of the cells (see zobristTable)
+    :param cell: index of the cell in the flattened board
+    :param symbol: symbol added in the cell
+    :return: the hash of the board after the action
+    """
+    return (parentHash ^ table[cell][pieceIndex(symbol)]) + PLY_UNIT
+
+
+def legacyHash(key, board_rows=6, board_cols=7):
+    """
+    Method that converts the string hash used by the first versions of the policies
+    (the printed flattened board) to the current hash
+    :param key: the string hash
+    :param board_rows: number of rows in the board
+    :param board_cols: number of columns in the board
+    :return: the hash of the same board
+    """
+    cells = np.array(key.strip("[]").split(), dtype=float)
+    return boardHash(cells.reshape(board_rows, board_cols))
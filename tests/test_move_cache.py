@@ -0,0 +1,48 @@
+from Enumerations import CellState
+from Game import Game
+from Player import ArtificialPlayer, HumanPlayer
+
+
+def playFirstAction(player):
+    """
+    Let the artificial player choose its first action on the empty board
+    :param player: the artificial player with X
+    :return: the game and the column chosen
+    """
+    game = Game(player, HumanPlayer("", CellState.O_Value))
+    positions = game.availablePositions()
+    action = player.chooseAction(positions, game.board, game.childHashes(positions, player.symbol),
+                                 boardHash=game.getHash())
+    return game, action
+
+
+def test_cache_saved_reloaded_and_hit(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    player = ArtificialPlayer("U-0318", CellState.X_Value, 0)
+    player.enableMoveCache(100, "Files/movecache")
+    game, action = playFirstAction(player)
+    game.updateState(action)
+    player.addState(game.getHash())
+    # The state chosen gets a higher value: the action doesn't change and stays in the cache
+    player.feedReward(2)
+    player.savePolicy()
+
+    reloaded = ArtificialPlayer("U-0318", CellState.X_Value, 0)
+    reloaded.loadPolicy(reloaded.policyFile())
+    reloaded.enableMoveCache(100, "Files/movecache")
+    assert len(reloaded.moveCache.entries) == 1
+    assert playFirstAction(reloaded)[1] == action
+    assert reloaded.moveCache.hits == 1
+
+
+def test_cache_drops_changed_actions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    player = ArtificialPlayer("U-0318", CellState.X_Value, 0)
+    player.enableMoveCache(100)
+    game, action = playFirstAction(player)
+    game.updateState(action)
+    player.addState(game.getHash())
+    # The state chosen gets a negative value: another action is the best one now
+    player.feedReward(-2)
+    assert len(player.moveCache.entries) == 0
+    assert playFirstAction(player)[1] != action